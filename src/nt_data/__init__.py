@@ -1,5 +1,5 @@
 ﻿"""Herramientas de datos para NinjaTrader."""
 
-from .config import Settings
+from .config import Settings, load_settings
 
-__all__ = ["Settings"]
\ No newline at end of file
+__all__ = ["Settings", "load_settings"]
\ No newline at end of file
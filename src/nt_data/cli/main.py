@@ -3,9 +3,13 @@ from __future__ import annotations
 
 import argparse
 import logging
+import signal
 import sys
+import threading
 import time
+from collections import deque
 from datetime import datetime, timedelta
+from typing import Callable
 
 from ..config import Settings
 from ..connectors import (
@@ -13,6 +17,7 @@ from ..connectors import (
     NinjaTraderClient,
     SimulatedNinjaTraderClient,
 )
+from ..models.tick import TickData
 from ..services import (
     HistoricalDataService,
     MarketDataService,
@@ -21,6 +26,10 @@ from ..services import (
 
 logger = logging.getLogger(__name__)
 
+TICK_BUFFER_SIZE = 100_000
+TICK_FLUSH_SIZE = 1_000
+TICK_LOG_INTERVAL = 1.0
+
 
 def _build_client(settings: Settings, use_simulator: bool, provider: str) -> NinjaTraderClient:
     if use_simulator:
@@ -31,10 +40,51 @@ def _build_client(settings: Settings, use_simulator: bool, provider: str) -> Nin
             export_dir=settings.export_dir,
             export_timeout=settings.export_timeout,
             poll_interval=settings.export_poll_seconds,
+            use_command_fifo=settings.commands_fifo,
         )
     raise NotImplementedError(f"Proveedor {provider} no soportado por nt_data")
 
 
+def _format_price(value: float | None) -> str:
+    """Redondea precios solo al mostrarlos; los ticks conservan el valor exacto."""
+    return "None" if value is None else f"{value:.2f}"
+
+
+def _start_tick_writer(
+    storage_service: StorageService,
+    buffer: deque[TickData],
+    flush_evt: threading.Event,
+) -> Callable[[], int]:
+    """Lanza un hilo que vacia ``buffer`` en bloques y devuelve su funcion de parada."""
+
+    done_evt = threading.Event()
+    saved = 0
+
+    def drain() -> None:
+        nonlocal saved
+        while buffer:
+            chunk = [buffer.popleft() for _ in range(min(TICK_FLUSH_SIZE, len(buffer)))]
+            saved += storage_service.save_ticks(chunk)
+
+    def run() -> None:
+        while not done_evt.is_set():
+            flush_evt.wait(timeout=1.0)
+            flush_evt.clear()
+            drain()
+        drain()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def stop() -> int:
+        done_evt.set()
+        flush_evt.set()
+        thread.join()
+        return saved
+
+    return stop
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Ejemplo de consumo de datos de NinjaTrader")
     parser.add_argument("--instrument", default=None, help="Instrumento a utilizar")
@@ -77,31 +127,59 @@ def main() -> int:
     historical_service = HistoricalDataService(client)
     storage_service = StorageService(db_path=settings.database_path)
 
-    collected_ticks = []
+    ticks_saved = 0
 
     if client.supports_realtime:
-        def on_tick(tick):
-            collected_ticks.append(tick)
-            logger.info(
-                "Tick %s bid=%s ask=%s last=%s vol=%s",
-                tick.instrument,
-                tick.bid,
-                tick.ask,
-                tick.last,
-                tick.volume,
-            )
+        tick_buffer: deque[TickData] = deque(maxlen=TICK_BUFFER_SIZE)
+        flush_evt = threading.Event()
+        stop_writer = _start_tick_writer(storage_service, tick_buffer, flush_evt)
+
+        tick_count = 0
+        last_log_t = time.monotonic()
 
+        def on_tick(tick):
+            nonlocal tick_count, last_log_t
+            tick_buffer.append(tick)
+            if len(tick_buffer) >= TICK_FLUSH_SIZE:
+                flush_evt.set()
+            tick_count += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Tick %s bid=%s ask=%s last=%s vol=%s",
+                    tick.instrument,
+                    _format_price(tick.bid),
+                    _format_price(tick.ask),
+                    _format_price(tick.last),
+                    tick.volume,
+                )
+            now = time.monotonic()
+            if now - last_log_t >= TICK_LOG_INTERVAL:
+                logger.info(
+                    "%s ticks recibidos de %s (ultimo last=%s)",
+                    tick_count,
+                    tick.instrument,
+                    _format_price(tick.last),
+                )
+                last_log_t = now
+
+        stop_evt = threading.Event()
+
+        def on_sigint(signum, frame):
+            logger.info("Interrupcion recibida, deteniendo la captura de ticks")
+            stop_evt.set()
+
+        previous_handler = signal.signal(signal.SIGINT, on_sigint)
         cancel = market_service.subscribe_realtime_ticks(instrument, on_tick)
         logger.info("Recolectando ticks de %s durante %s...", instrument, duration)
         try:
-            end_time = datetime.utcnow() + duration
-            while datetime.utcnow() < end_time:
-                time.sleep(0.5)
+            # Plazo monotono: inmune a saltos del reloj y sin sondeo periodico.
+            deadline = time.monotonic() + duration.total_seconds()
+            stop_evt.wait(timeout=max(0.0, deadline - time.monotonic()))
         finally:
+            signal.signal(signal.SIGINT, previous_handler)
             cancel()
             market_service.stop_all()
-        if collected_ticks:
-            storage_service.save_ticks(collected_ticks)
+            ticks_saved = stop_writer()
     else:
         logger.info(
             "Proveedor %s no ofrece tiempo real; se omitira la captura de ticks", provider
@@ -119,9 +197,10 @@ def main() -> int:
 
     sample_tick = storage_service.get_ticks(instrument=instrument, limit=1)
     sample_bar = storage_service.get_bars(instrument=instrument, timeframe=timeframe, limit=1)
+    storage_service.close()
     logger.info(
         "Resumen: %s ticks y %s barras almacenados en %s",
-        len(collected_ticks),
+        ticks_saved,
         bars_saved,
         settings.database_path,
     )
@@ -129,8 +208,8 @@ def main() -> int:
         logger.info(
             "Ejemplo tick guardado: %s bid=%s ask=%s",
             sample_tick[0].time.isoformat(),
-            sample_tick[0].bid,
-            sample_tick[0].ask,
+            _format_price(sample_tick[0].bid),
+            _format_price(sample_tick[0].ask),
         )
     if sample_bar:
         logger.info(
@@ -1,9 +1,10 @@
 ﻿"""Configuracion general de la aplicacion."""
 from __future__ import annotations
 
+import functools
 import os
-from dataclasses import dataclass
 from datetime import timedelta
+from typing import NamedTuple
 
 try:  # pragma: no cover - configuracion opcional
     from dotenv import load_dotenv
@@ -19,28 +20,60 @@ def _get_env(name: str, default: str) -> str:
     return value if value else default
 
 
-@dataclass(slots=True)
-class Settings:
-    """Configuracion basica leida de variables de entorno."""
+class _SettingsFields(NamedTuple):
+    instrument: str
+    timeframe: str
+    historical_days: int
+    realtime_duration: timedelta
+    data_folder: str
+    use_simulator: bool
+    database_path: str
+    data_provider: str
+    commands_dir: str
+    export_dir: str
+    export_timeout: int
+    export_poll_seconds: float
+    commands_fifo: bool
 
-    instrument: str = _get_env("NT_INSTRUMENT", "ES 12-25")
-    timeframe: str = _get_env("NT_TIMEFRAME", "5m")
-    historical_days: int = int(_get_env("NT_HISTORICAL_DAYS", "5"))
-    realtime_duration: timedelta = timedelta(
-        seconds=int(_get_env("NT_REALTIME_SECONDS", "15"))
-    )
-    data_folder: str = _get_env("NT_DATA_DIR", os.path.join("data"))
-    use_simulator: bool = _get_env("NT_USE_SIMULATOR", "true").lower() == "true"
-    database_path: str = _get_env(
-        "NT_DATABASE_PATH", os.path.join(data_folder, "market_data.db")
-    )
-    data_provider: str = _get_env("NT_DATA_PROVIDER", "kinetick_eod")
-    commands_dir: str = _get_env(
-        "NT_COMMANDS_DIR", os.path.join(data_folder, "commands")
+
+class Settings(_SettingsFields):
+    """Configuracion basica leida de variables de entorno.
+
+    ``Settings()`` sin argumentos devuelve la instancia de ``load_settings()``,
+    que lee el entorno una unica vez. ``load_settings.cache_clear()`` fuerza una
+    relectura en la siguiente llamada (por ejemplo, en tests). Con argumentos se
+    construye una configuracion explicita como cualquier ``NamedTuple``.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs) -> "Settings":
+        if not args and not kwargs:
+            return load_settings()
+        return super().__new__(cls, *args, **kwargs)
+
+
+@functools.lru_cache(maxsize=1)
+def load_settings() -> Settings:
+    """Construye ``Settings`` a partir del entorno actual."""
+    data_folder = _get_env("NT_DATA_DIR", os.path.join("data"))
+    return Settings(
+        instrument=_get_env("NT_INSTRUMENT", "ES 12-25"),
+        timeframe=_get_env("NT_TIMEFRAME", "5m"),
+        historical_days=int(_get_env("NT_HISTORICAL_DAYS", "5")),
+        realtime_duration=timedelta(seconds=int(_get_env("NT_REALTIME_SECONDS", "15"))),
+        data_folder=data_folder,
+        use_simulator=_get_env("NT_USE_SIMULATOR", "true").lower() == "true",
+        database_path=_get_env(
+            "NT_DATABASE_PATH", os.path.join(data_folder, "market_data.db")
+        ),
+        data_provider=_get_env("NT_DATA_PROVIDER", "kinetick_eod"),
+        commands_dir=_get_env("NT_COMMANDS_DIR", os.path.join(data_folder, "commands")),
+        export_dir=_get_env("NT_EXPORT_DIR", os.path.join(data_folder, "exports")),
+        export_timeout=int(_get_env("NT_EXPORT_TIMEOUT", "90")),
+        export_poll_seconds=float(_get_env("NT_EXPORT_POLL_SECONDS", "1.0")),
+        commands_fifo=_get_env("NT_COMMANDS_FIFO", "false").lower() == "true",
     )
-    export_dir: str = _get_env("NT_EXPORT_DIR", os.path.join(data_folder, "exports"))
-    export_timeout: int = int(_get_env("NT_EXPORT_TIMEOUT", "90"))
-    export_poll_seconds: float = float(_get_env("NT_EXPORT_POLL_SECONDS", "1.0"))
 
 
-settings = Settings()
+settings = load_settings()
@@ -1,23 +1,38 @@
 ﻿"""Clientes para conectar con NinjaTrader u otras fuentes de datos."""
 from __future__ import annotations
 
-import csv
+import functools
 import logging
-import random
+import os
 import threading
 import time
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Callable, List
+from typing import Callable, List, Tuple
 from uuid import uuid4
 
+import numpy as np
+import pandas as pd
+
+try:  # pragma: no cover - dependencia opcional, solo disponible en Linux
+    from inotify_simple import INotify
+    from inotify_simple import flags as inotify_flags
+except ImportError:  # pragma: no cover
+    INotify = None
+
 from ..models.bar import BarData
 from ..models.tick import TickData
 
 logger = logging.getLogger(__name__)
 
 MarketDataCallback = Callable[[TickData], None]
+HistoricalColumns = Tuple[
+    np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray
+]
+
+_EXPORT_PRICE_COLUMNS = ("open", "high", "low", "close")
+COMMANDS_FIFO_NAME = "commands.fifo"
 
 
 class ConnectionError(RuntimeError):
@@ -64,13 +79,21 @@ class NinjaTraderClient(ABC):
 
 
 class SimulatedNinjaTraderClient(NinjaTraderClient):
-    """Cliente simulado que genera datos aleatorios."""
+    """Cliente simulado que genera datos aleatorios.
+
+    Con ``tick_pool_size > 0`` cada suscripcion reutiliza en rotacion un
+    conjunto fijo de ``TickData`` en lugar de crear uno por tick; el callback
+    debe copiar el tick si necesita conservarlo mas alla de esa rotacion.
+    """
 
-    def __init__(self, tick_interval: float = 1.0) -> None:
+    def __init__(self, tick_interval: float = 1.0, tick_pool_size: int = 0) -> None:
         super().__init__()
         self._tick_interval = tick_interval
+        self._tick_pool_size = tick_pool_size
         self._stop_event = threading.Event()
-        self._subscriptions: list[tuple[str, threading.Event, threading.Thread]] = []
+        # Tupla inmutable: se reemplaza completa al suscribir/cancelar y se
+        # recorre sin bloqueo. El lock solo serializa los reemplazos.
+        self._subscriptions: tuple[tuple[str, threading.Event, threading.Thread], ...] = ()
         self._lock = threading.Lock()
 
     def connect(self) -> None:
@@ -83,10 +106,10 @@ class SimulatedNinjaTraderClient(NinjaTraderClient):
         logger.info("Desconectando cliente simulado")
         self._stop_event.set()
         with self._lock:
-            for _, stop_event, thread in self._subscriptions:
-                stop_event.set()
-                thread.join(timeout=1)
-            self._subscriptions.clear()
+            subscriptions, self._subscriptions = self._subscriptions, ()
+        for _, stop_event, thread in subscriptions:
+            stop_event.set()
+            thread.join(timeout=1)
         self._set_connected(False)
         logger.info("Cliente simulado desconectado")
 
@@ -97,47 +120,105 @@ class SimulatedNinjaTraderClient(NinjaTraderClient):
             raise ConnectionError("No hay conexion con NinjaTrader")
 
         stop_event = threading.Event()
+        pool = [
+            TickData(
+                time=datetime.min,
+                bid=None,
+                ask=None,
+                last=None,
+                volume=None,
+                instrument=instrument,
+            )
+            for _ in range(self._tick_pool_size)
+        ]
 
         def _stream() -> None:
-            last_price = random.uniform(1000, 5000)
-            while not (stop_event.is_set() or self._stop_event.is_set()):
-                change = random.uniform(-1.5, 1.5)
+            randoms = _TickRandoms()
+            last_price = randoms.initial_price
+            index = 0
+            while True:
+                change, spread, within, volume = randoms.next()
                 bid = max(0.0, last_price + change - 0.5)
-                ask = bid + random.uniform(0.25, 1.25)
-                last_price = bid + random.uniform(0, ask - bid)
-                tick = TickData(
-                    time=datetime.utcnow(),
-                    bid=round(bid, 2),
-                    ask=round(ask, 2),
-                    last=round(last_price, 2),
-                    volume=random.randint(1, 10),
-                    instrument=instrument,
-                )
+                ask = bid + spread
+                last_price = bid + within * spread
+                if pool:
+                    tick = pool[index]
+                    index = (index + 1) % len(pool)
+                    tick.reset(
+                        time=datetime.utcnow(),
+                        bid=bid,
+                        ask=ask,
+                        last=last_price,
+                        volume=volume,
+                    )
+                else:
+                    tick = TickData(
+                        time=datetime.utcnow(),
+                        bid=bid,
+                        ask=ask,
+                        last=last_price,
+                        volume=volume,
+                        instrument=instrument,
+                    )
                 try:
                     on_tick(tick)
                 except Exception as exc:  # pragma: no cover - logging defensivo
                     logger.exception("Error en callback de tick: %s", exc)
-                time.sleep(self._tick_interval)
+                # wait() despierta en cuanto se cancela, sin agotar el intervalo.
+                if stop_event.wait(self._tick_interval) or self._stop_event.is_set():
+                    break
 
         thread = threading.Thread(target=_stream, daemon=True)
         thread.start()
 
         with self._lock:
-            self._subscriptions.append((instrument, stop_event, thread))
+            self._subscriptions = self._subscriptions + ((instrument, stop_event, thread),)
 
         def cancel() -> None:
             stop_event.set()
             thread.join(timeout=1)
             with self._lock:
-                self._subscriptions = [
+                self._subscriptions = tuple(
                     sub for sub in self._subscriptions if sub[1] is not stop_event
-                ]
+                )
 
         return cancel
 
     def request_historical_data(
         self, instrument: str, timeframe: str, start: datetime, end: datetime
     ) -> List[BarData]:
+        _, opens, highs, lows, closes, volumes = self.request_historical_bars_columnar(
+            instrument, timeframe, start, end
+        )
+        delta = _timeframe_to_timedelta(timeframe)
+        # El numero de barras se conoce de antemano: se reserva la lista completa
+        # y se rellena por indice en lugar de crecerla con append.
+        bars: List[BarData] = [None] * len(closes)  # type: ignore[list-item]
+        for index, (open_, high, low, close, volume) in enumerate(
+            zip(
+                opens.tolist(),
+                highs.tolist(),
+                lows.tolist(),
+                closes.tolist(),
+                volumes.tolist(),
+            )
+        ):
+            bars[index] = BarData(
+                time=start + index * delta,
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                volume=volume,
+                instrument=instrument,
+                timeframe=timeframe,
+            )
+        return bars
+
+    def request_historical_bars_columnar(
+        self, instrument: str, timeframe: str, start: datetime, end: datetime
+    ) -> HistoricalColumns:
+        """Genera barras simuladas como arrays ``(times, open, high, low, close, volume)``."""
         if not self.is_connected:
             raise ConnectionError("No hay conexion con NinjaTrader")
         logger.info(
@@ -145,32 +226,70 @@ class SimulatedNinjaTraderClient(NinjaTraderClient):
             instrument,
             timeframe,
         )
-        bars: List[BarData] = []
         delta = _timeframe_to_timedelta(timeframe)
-        current = start
-        price = random.uniform(1000, 5000)
-        while current < end:
-            high = price + random.uniform(0, 5)
-            low = price - random.uniform(0, 5)
-            close = random.uniform(low, high)
-            volume = random.randint(10, 1000)
-            bars.append(
-                BarData(
-                    time=current,
-                    open=round(price, 2),
-                    high=round(high, 2),
-                    low=round(low, 2),
-                    close=round(close, 2),
-                    volume=volume,
-                    instrument=instrument,
-                    timeframe=timeframe,
-                )
-            )
-            current += delta
-            price = close
-        return bars
+        count = max(0, -(-(end - start) // delta))
+        rng = np.random.default_rng()
+        high_offsets = rng.uniform(0, 5, count)
+        low_offsets = rng.uniform(0, 5, count)
+        close_positions = rng.uniform(size=count)
+        volumes = rng.integers(10, 1000, count, endpoint=True)
+        # El cierre de cada barra es la apertura de la siguiente, por lo que la
+        # serie de aperturas es la suma acumulada de las variaciones anteriores
+        # (con ``count`` elementos, tambien cuando el rango esta vacio).
+        changes = close_positions * (high_offsets + low_offsets) - low_offsets
+        opens = rng.uniform(1000, 5000) + np.cumsum(changes) - changes
+        closes = opens + changes
+        if start.tzinfo is not None:
+            start = start.astimezone(timezone.utc).replace(tzinfo=None)
+        seconds = _TIMEFRAME_SECONDS.get(timeframe)
+        step = np.timedelta64(delta, "us") if seconds is None else np.timedelta64(seconds, "s")
+        times = np.datetime64(start, "us") + np.arange(count) * step
+        return (
+            times,
+            np.round(opens, 2),
+            np.round(opens + high_offsets, 2),
+            np.round(opens - low_offsets, 2),
+            np.round(closes, 2),
+            volumes,
+        )
+
+
+class _TickRandoms:
+    """Bloques de aleatorios precalculados con NumPy para un stream simulado.
+
+    Cada suscripcion crea su propia instancia, por lo que no se comparte el
+    generador entre hilos.
+    """
+
+    def __init__(self, block_size: int = 4096) -> None:
+        self._rng = np.random.default_rng()
+        self._block_size = block_size
+        self.initial_price = float(self._rng.uniform(1000, 5000))
+        self._refill()
+
+    def _refill(self) -> None:
+        size = self._block_size
+        self._changes = self._rng.uniform(-1.5, 1.5, size).tolist()
+        self._spreads = self._rng.uniform(0.25, 1.25, size).tolist()
+        self._within = self._rng.uniform(0, 1, size).tolist()
+        self._volumes = self._rng.integers(1, 10, size, endpoint=True).tolist()
+        self._index = 0
+
+    def next(self) -> tuple[float, float, float, int]:
+        """Devuelve ``(cambio, spread, posicion_en_spread, volumen)``."""
+        if self._index == self._block_size:
+            self._refill()
+        index = self._index
+        self._index += 1
+        return (
+            self._changes[index],
+            self._spreads[index],
+            self._within[index],
+            self._volumes[index],
+        )
 
 
+@functools.lru_cache(maxsize=None)
 def _timeframe_to_timedelta(timeframe: str) -> timedelta:
     unit = timeframe[-1]
     value = int(timeframe[:-1]) if timeframe[:-1] else 1
@@ -180,10 +299,19 @@ def _timeframe_to_timedelta(timeframe: str) -> timedelta:
         return timedelta(hours=value)
     if unit == "s":
         return timedelta(seconds=value)
+    if unit in {"d", "D"}:
+        return timedelta(days=value)
     logger.warning("Timeframe %s no reconocido, usando 1m", timeframe)
     return timedelta(minutes=1)
 
 
+# Segundos por barra de los timeframes habituales, para el camino vectorizado.
+_TIMEFRAME_SECONDS: dict[str, int] = {
+    timeframe: int(_timeframe_to_timedelta(timeframe).total_seconds())
+    for timeframe in ("1m", "5m", "15m", "1h", "4h", "1d")
+}
+
+
 class KinetickEODClient(NinjaTraderClient):
     """Cliente que coordina con un AddOn de NinjaTrader para descargar datos diarios."""
 
@@ -193,12 +321,16 @@ class KinetickEODClient(NinjaTraderClient):
         export_dir: str | Path,
         export_timeout: float = 90.0,
         poll_interval: float = 1.0,
+        use_command_fifo: bool = False,
     ) -> None:
         super().__init__()
         self._commands_dir = Path(commands_dir)
         self._export_dir = Path(export_dir)
         self._export_timeout = export_timeout
         self._poll_interval = poll_interval
+        self._use_command_fifo = use_command_fifo and hasattr(os, "mkfifo")
+        self._fifo_path = self._commands_dir / COMMANDS_FIFO_NAME
+        self._fifo_fd: int | None = None
 
     @property
     def supports_realtime(self) -> bool:
@@ -207,12 +339,18 @@ class KinetickEODClient(NinjaTraderClient):
     def connect(self) -> None:
         self._commands_dir.mkdir(parents=True, exist_ok=True)
         self._export_dir.mkdir(parents=True, exist_ok=True)
+        if self._use_command_fifo:
+            try:
+                os.mkfifo(self._fifo_path)
+            except FileExistsError:
+                pass
         logger.info(
             "Cliente KinetickEOD listo. Asegure que NinjaTrader y el AddOn esten activos"
         )
         self._set_connected(True)
 
     def disconnect(self) -> None:
+        self._close_command_fifo()
         self._set_connected(False)
 
     def subscribe_market_data(
@@ -241,52 +379,155 @@ class KinetickEODClient(NinjaTraderClient):
                 export_path.as_posix(),
             ]
         )
-        command_path.write_text(payload, encoding="utf-8")
-        logger.info("Comando KinetickEOD generado: %s", payload)
+        # El watcher se registra antes de emitir el comando para no perder el evento.
+        watcher = self._open_export_watcher()
+        sent_by_fifo = False
         try:
-            bars = self._wait_for_export(export_path, instrument)
+            sent_by_fifo = self._send_command_fifo(payload)
+            if not sent_by_fifo:
+                command_path.write_text(payload, encoding="utf-8")
+            logger.info("Comando KinetickEOD generado: %s", payload)
+            bars = self._wait_for_export(export_path, instrument, watcher)
         finally:
-            if command_path.exists():
+            if watcher is not None:
+                watcher.close()
+            if not sent_by_fifo and command_path.exists():
                 command_path.unlink(missing_ok=True)
         return bars
 
-    def _wait_for_export(self, export_path: Path, instrument: str) -> List[BarData]:
-        start_time = time.time()
-        while time.time() - start_time < self._export_timeout:
-            if export_path.exists():
-                logger.info("Archivo generado por NinjaTrader: %s", export_path)
-                bars = self._parse_export(export_path, instrument)
-                export_path.unlink(missing_ok=True)
-                return bars
-            time.sleep(self._poll_interval)
-        raise TimeoutError(
-            f"No se recibio respuesta de NinjaTrader dentro de {self._export_timeout}s"
-        )
+    def _send_command_fifo(self, payload: str) -> bool:
+        """Escribe el comando en la FIFO persistente; ``False`` si no hay lector."""
+        if not self._use_command_fifo:
+            return False
+        if self._fifo_fd is None:
+            try:
+                self._fifo_fd = os.open(self._fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as exc:
+                # ENXIO: el AddOn todavia no abrio la FIFO para lectura.
+                logger.debug("FIFO de comandos no disponible: %s", exc)
+                return False
+        try:
+            # Lineas menores que PIPE_BUF: cada escritura llega completa.
+            os.write(self._fifo_fd, (payload + "\n").encode("utf-8"))
+        except OSError as exc:
+            logger.warning("Fallo la FIFO de comandos, se usara un archivo: %s", exc)
+            self._close_command_fifo()
+            return False
+        return True
 
-    def _parse_export(self, export_path: Path, instrument: str) -> List[BarData]:
-        bars: List[BarData] = []
-        with export_path.open("r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                date_value = row.get("Date") or row.get("date")
-                if not date_value:
-                    continue
-                try:
-                    time_value = datetime.fromisoformat(date_value)
-                except ValueError:
-                    time_value = datetime.strptime(date_value, "%Y-%m-%d")
-                bars.append(
-                    BarData(
-                        time=time_value,
-                        open=float(row.get("Open", 0.0) or 0.0),
-                        high=float(row.get("High", 0.0) or 0.0),
-                        low=float(row.get("Low", 0.0) or 0.0),
-                        close=float(row.get("Close", 0.0) or 0.0),
-                        volume=int(float(row.get("Volume", 0) or 0)),
-                        instrument=instrument,
-                        timeframe="1D",
-                    )
+    def _close_command_fifo(self) -> None:
+        if self._fifo_fd is not None:
+            os.close(self._fifo_fd)
+            self._fifo_fd = None
+
+    def _open_export_watcher(self) -> INotify | None:
+        """Crea un watcher inotify sobre el directorio de exportacion si es posible."""
+        if INotify is None:
+            return None
+        try:
+            watcher = INotify()
+        except OSError as exc:
+            logger.warning("inotify no disponible, se usara sondeo: %s", exc)
+            return None
+        try:
+            watcher.add_watch(
+                self._export_dir, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+            )
+        except OSError as exc:
+            watcher.close()
+            logger.warning("inotify no disponible, se usara sondeo: %s", exc)
+            return None
+        return watcher
+
+    def _wait_for_export(
+        self, export_path: Path, instrument: str, watcher: INotify | None = None
+    ) -> List[BarData]:
+        deadline = time.monotonic() + self._export_timeout
+        while export_path.name not in self._scan_export_dir():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    "No se recibio respuesta de NinjaTrader dentro de "
+                    f"{self._export_timeout}s"
                 )
+            wait = min(self._poll_interval, remaining)
+            if watcher is None:
+                time.sleep(wait)
+                continue
+            # Cada espera de inotify dura como mucho ``poll_interval`` y se vuelve
+            # a sondear: en carpetas de red (CIFS/NFS) las escrituras del equipo
+            # Windows donde corre NinjaTrader no generan eventos.
+            events = watcher.read(timeout=int(wait * 1000))
+            if any(event.name == export_path.name for event in events):
+                break
+        logger.info("Archivo generado por NinjaTrader: %s", export_path)
+        bars = self._parse_export(export_path, instrument)
+        export_path.unlink(missing_ok=True)
+        return bars
+
+    def _scan_export_dir(self) -> set[str]:
+        """Nombres presentes en el directorio de exportacion, en una sola llamada."""
+        try:
+            with os.scandir(self._export_dir) as entries:
+                return {entry.name for entry in entries}
+        except FileNotFoundError:
+            return set()
+
+    def _parse_export(self, export_path: Path, instrument: str) -> List[BarData]:
+        frame = self._read_export_frame(export_path)
+        times = pd.DatetimeIndex(frame["date"]).to_pydatetime()
+        bars = [
+            BarData(
+                time=time_value,
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                volume=volume,
+                instrument=instrument,
+                timeframe="1D",
+            )
+            for time_value, (open_, high, low, close, volume) in zip(
+                times,
+                frame[list(_EXPORT_PRICE_COLUMNS + ("volume",))].itertuples(
+                    index=False, name=None
+                ),
+            )
+        ]
         if not bars:
             logger.warning("El archivo %s no contenia barras", export_path)
-        return bars
\ No newline at end of file
+        return bars
+
+    def _read_export_frame(self, export_path: Path) -> pd.DataFrame:
+        """Lee el CSV exportado como columnas ``date, open, high, low, close, volume``."""
+        try:
+            frame = pd.read_csv(export_path, encoding="utf-8")
+        except pd.errors.EmptyDataError:
+            frame = pd.DataFrame()
+        frame.columns = [str(column).strip().lower() for column in frame.columns]
+        if "date" not in frame.columns:
+            frame["date"] = pd.Series(dtype=object)
+        frame = frame.dropna(subset=["date"])
+        columns = {"date": _parse_export_dates(frame["date"].astype(str))}
+        for name in _EXPORT_PRICE_COLUMNS + ("volume",):
+            values = frame[name] if name in frame.columns else pd.Series(index=frame.index)
+            columns[name] = pd.to_numeric(values).fillna(0.0).astype("float64")
+        columns["volume"] = columns["volume"].astype("int64")
+        return pd.DataFrame(columns, index=frame.index)
+
+
+def _parse_export_dates(values: pd.Series) -> pd.Series:
+    """Convierte las fechas del CSV priorizando el formato fijo ``YYYY-MM-DD``.
+
+    El AddOn exporta barras diarias como ``YYYY-MM-DD``; en ese caso se usa un
+    formato exacto, sin inferencia, y solo se recurre al parser ISO 8601 general
+    cuando alguna fila trae hora o zona.
+    """
+    is_ymd = (
+        (values.str.len() == 10)
+        & (values.str[4] == "-")
+        & (values.str[7] == "-")
+    )
+    if bool(is_ymd.all()):
+        return pd.to_datetime(values, format="%Y-%m-%d")
+    return pd.to_datetime(values, format="ISO8601")
@@ -1,10 +1,15 @@
 ﻿"""Modelos de datos."""
 from .bar import BarData
+from .batch import BAR_DTYPE, TICK_DTYPE, BarBatch, TickBatch
 from .order_book import OrderBookSnapshot, PriceLevel
 from .tick import TickData
 
 __all__ = [
+    "BAR_DTYPE",
+    "BarBatch",
     "BarData",
+    "TICK_DTYPE",
+    "TickBatch",
     "TickData",
     "OrderBookSnapshot",
     "PriceLevel",
@@ -0,0 +1,260 @@
+﻿"""Bloques columnares (SoA) de ticks y barras respaldados por NumPy."""
+from __future__ import annotations
+
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Generic, Iterable, Iterator, List, Sequence, TypeVar
+
+import numpy as np
+
+from .bar import BarData
+from .tick import TickData
+
+TICK_DTYPE = np.dtype(
+    [
+        ("time", "i8"),
+        ("bid", "f8"),
+        ("ask", "f8"),
+        ("last", "f8"),
+        ("volume", "i4"),
+        ("instr", "i2"),
+    ]
+)
+BAR_DTYPE = np.dtype(
+    [
+        ("time", "i8"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("volume", "i4"),
+        ("instr", "i2"),
+        ("timeframe", "i2"),
+    ]
+)
+
+# Valor usado en columnas enteras para representar un volumen desconocido.
+MISSING_VOLUME = -1
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class InternTable:
+    """Asigna identificadores ``int16`` estables a cadenas repetidas."""
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, name: str) -> int:
+        identifier = self._ids.get(name)
+        if identifier is not None:
+            return identifier
+        with self._lock:
+            identifier = self._ids.get(name)
+            if identifier is None:
+                identifier = len(self._names)
+                if identifier > np.iinfo(np.int16).max:
+                    raise OverflowError("La tabla de internado supera el rango int16")
+                self._names.append(name)
+                self._ids[name] = identifier
+        return identifier
+
+    def name(self, identifier: int) -> str:
+        return self._names[identifier]
+
+
+instrument_table = InternTable()
+timeframe_table = InternTable()
+
+
+def datetime_to_ns(value: datetime) -> int:
+    """Convierte a epoch en nanosegundos; las fechas naive se asumen UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def ns_to_datetime(value: int) -> datetime:
+    """Inversa de :func:`datetime_to_ns`; devuelve una fecha naive en UTC."""
+    return _EPOCH + timedelta(microseconds=value // 1000)
+
+
+def _optional_float(value: float | None) -> float:
+    return math.nan if value is None else value
+
+
+def _float_or_none(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+T = TypeVar("T")
+
+
+class _StructuredBatch(Generic[T]):
+    """Base comun: array estructurado preasignado que crece por duplicacion."""
+
+    dtype: np.dtype
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._data = np.empty(max(1, capacity), dtype=self.dtype)
+        self._size = 0
+
+    @classmethod
+    def from_records(cls, items: Sequence[T]):
+        batch = cls(capacity=len(items))
+        batch.extend(items)
+        return batch
+
+    @property
+    def array(self) -> np.ndarray:
+        """Vista de las filas ocupadas (sin copia)."""
+        return self._data[: self._size]
+
+    def append(self, item: T) -> None:
+        if self._size == len(self._data):
+            self._grow(self._size + 1)
+        self._data[self._size] = self._to_record(item)
+        self._size += 1
+
+    def extend(self, items: Iterable[T]) -> None:
+        records = [self._to_record(item) for item in items]
+        if not records:
+            return
+        end = self._size + len(records)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size : end] = records
+        self._size = end
+
+    def clear(self) -> None:
+        self._size = 0
+
+    def copy(self):
+        """Lote independiente con una copia de las filas ocupadas."""
+        batch = type(self)(capacity=self._size)
+        batch._data[: self._size] = self.array
+        batch._size = self._size
+        return batch
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> T:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._from_record(self._data[index].tolist())
+
+    def __iter__(self) -> Iterator[T]:
+        return (self._from_record(row) for row in self.array.tolist())
+
+    def to_list(self) -> List[T]:
+        return list(self)
+
+    def _grow(self, required: int) -> None:
+        capacity = len(self._data)
+        while capacity < required:
+            capacity *= 2
+        data = np.empty(capacity, dtype=self.dtype)
+        data[: self._size] = self._data[: self._size]
+        self._data = data
+
+    def _to_record(self, item: T) -> tuple:
+        raise NotImplementedError
+
+    def _from_record(self, row: tuple) -> T:
+        raise NotImplementedError
+
+
+class TickBatch(_StructuredBatch[TickData]):
+    """Ticks en formato columnar con ``TICK_DTYPE``.
+
+    Los precios ausentes se guardan como ``NaN`` y el volumen ausente como
+    ``MISSING_VOLUME``; al iterar se vuelven a exponer como ``None``.
+    """
+
+    dtype = TICK_DTYPE
+
+    @classmethod
+    def from_ticks(cls, ticks: Sequence[TickData]) -> "TickBatch":
+        return cls.from_records(ticks)
+
+    def to_ticks(self) -> List[TickData]:
+        return self.to_list()
+
+    def _to_record(self, tick: TickData) -> tuple:
+        return (
+            datetime_to_ns(tick.time),
+            _optional_float(tick.bid),
+            _optional_float(tick.ask),
+            _optional_float(tick.last),
+            MISSING_VOLUME if tick.volume is None else tick.volume,
+            instrument_table.intern(tick.instrument),
+        )
+
+    def _from_record(self, row: tuple) -> TickData:
+        time_ns, bid, ask, last, volume, instr = row
+        return TickData(
+            time=ns_to_datetime(time_ns),
+            bid=_float_or_none(bid),
+            ask=_float_or_none(ask),
+            last=_float_or_none(last),
+            volume=None if volume == MISSING_VOLUME else volume,
+            instrument=instrument_table.name(instr),
+        )
+
+
+class BarBatch(_StructuredBatch[BarData]):
+    """Barras OHLCV en formato columnar con ``BAR_DTYPE``."""
+
+    dtype = BAR_DTYPE
+
+    @classmethod
+    def from_bars(cls, bars: Sequence[BarData]) -> "BarBatch":
+        return cls.from_records(bars)
+
+    def to_bars(self) -> List[BarData]:
+        return self.to_list()
+
+    def _to_record(self, bar: BarData) -> tuple:
+        return (
+            datetime_to_ns(bar.time),
+            bar.open,
+            bar.high,
+            bar.low,
+            bar.close,
+            bar.volume,
+            instrument_table.intern(bar.instrument),
+            timeframe_table.intern(bar.timeframe),
+        )
+
+    def _from_record(self, row: tuple) -> BarData:
+        time_ns, open_, high, low, close, volume, instr, timeframe = row
+        return BarData(
+            time=ns_to_datetime(time_ns),
+            open=open_,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            instrument=instrument_table.name(instr),
+            timeframe=timeframe_table.name(timeframe),
+        )
+
+
+__all__ = [
+    "BAR_DTYPE",
+    "BarBatch",
+    "InternTable",
+    "MISSING_VOLUME",
+    "TICK_DTYPE",
+    "TickBatch",
+    "datetime_to_ns",
+    "instrument_table",
+    "ns_to_datetime",
+    "timeframe_table",
+]
@@ -17,5 +17,20 @@ class TickData:
     volume: Optional[int]
     instrument: str
 
+    def reset(
+        self,
+        time: datetime,
+        bid: Optional[float],
+        ask: Optional[float],
+        last: Optional[float],
+        volume: Optional[int],
+    ) -> None:
+        """Reutiliza la instancia sobrescribiendo sus campos en el sitio."""
+        self.time = time
+        self.bid = bid
+        self.ask = ask
+        self.last = last
+        self.volume = volume
+
 
 __all__ = ["TickData"]
\ No newline at end of file
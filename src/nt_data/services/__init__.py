@@ -1,12 +1,17 @@
 ﻿"""Servicios disponibles."""
 
+from .compressed_storage import CompressedTickStorageBackend
 from .historical_data_service import HistoricalDataService
 from .market_data_service import MarketDataService
+from .partitioned_storage import ChunkRouter, PartitionedSQLiteStorageBackend
 from .storage_service import SQLiteStorageBackend, StorageBackend, StorageService
 
 __all__ = [
+    "ChunkRouter",
+    "CompressedTickStorageBackend",
     "HistoricalDataService",
     "MarketDataService",
+    "PartitionedSQLiteStorageBackend",
     "SQLiteStorageBackend",
     "StorageBackend",
     "StorageService",
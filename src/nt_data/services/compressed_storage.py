@@ -0,0 +1,261 @@
+﻿"""Almacenamiento de ticks en bloques comprimidos con Gorilla."""
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from ..models.batch import MISSING_VOLUME, datetime_to_ns, ns_to_datetime
+from ..models.tick import TickData
+from .gorilla import decode_floats, decode_ints, encode_floats, encode_ints
+from .storage_service import (
+    _TICK_FIELDS,
+    Order,
+    SQLiteStorageBackend,
+    StorageBackend,
+    _resolve_order,
+    _tick_columns,
+)
+
+_NS_PER_DAY = 86_400 * 1_000_000_000
+# Mientras el ultimo bloque de un instrumento y dia tenga menos ticks que esto,
+# los lotes nuevos se funden con el en lugar de abrir otro bloque. Fundir obliga
+# a recodificar el bloque, asi que el umbral acota tambien ese coste.
+_BLOCK_TARGET = 256
+
+_CREATE_BLOCKS_SQL = """
+    CREATE TABLE IF NOT EXISTS tick_blocks (
+        id INTEGER PRIMARY KEY,
+        instrument TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        start_time INTEGER NOT NULL,
+        end_time INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        time_blob BLOB NOT NULL,
+        bid_blob BLOB NOT NULL,
+        ask_blob BLOB NOT NULL,
+        last_blob BLOB NOT NULL,
+        volume_blob BLOB NOT NULL
+    )
+"""
+_INSERT_BLOCK_SQL = """
+    INSERT INTO tick_blocks (
+        instrument, day, start_time, end_time, count,
+        time_blob, bid_blob, ask_blob, last_blob, volume_blob
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_LAST_BLOCK_SQL = """
+    SELECT id, count, time_blob, bid_blob, ask_blob, last_blob, volume_blob
+    FROM tick_blocks WHERE instrument = ? AND day = ? ORDER BY id DESC LIMIT 1
+"""
+_UPDATE_BLOCK_SQL = """
+    UPDATE tick_blocks SET
+        start_time = ?, end_time = ?, count = ?,
+        time_blob = ?, bid_blob = ?, ask_blob = ?, last_blob = ?, volume_blob = ?
+    WHERE id = ?
+"""
+
+_by_time = itemgetter(1)
+
+
+class CompressedTickStorageBackend(SQLiteStorageBackend):
+    """Variante de :class:`SQLiteStorageBackend` que comprime los ticks.
+
+    Los ticks se agrupan en bloques por instrumento y dia UTC con las columnas
+    codificadas en ``tick_blocks``: ``time`` como delta-de-delta, ``volume`` como
+    delta y los precios como XOR (ver :mod:`nt_data.services.gorilla`). Cada
+    llamada a ``save_ticks`` funde sus ticks con el ultimo bloque del mismo
+    instrumento y dia mientras este tenga menos de ``_BLOCK_TARGET`` ticks, de
+    modo que muchos lotes pequenos no ocupan un bloque cada uno. Las lecturas
+    descomprimen solo los bloques que solapan el rango pedido. Las barras y los
+    ticks previos de la tabla ``ticks`` se sirven como en el backend base.
+    """
+
+    def _initialize(self) -> None:
+        super()._initialize()
+        self._run_write(_create_blocks)
+
+    def save_ticks(self, ticks: Sequence[TickData]) -> int:
+        if not ticks:
+            return 0
+        groups: dict[tuple[str, int], list[tuple]] = {}
+        for instrument, time, bid, ask, last, volume in map(_TICK_FIELDS, ticks):
+            time_ns = datetime_to_ns(time)
+            groups.setdefault((instrument, time_ns // _NS_PER_DAY), []).append(
+                (time_ns, bid, ask, last, MISSING_VOLUME if volume is None else volume)
+            )
+
+        def write(conn: sqlite3.Connection) -> None:
+            for (instrument, day), rows in groups.items():
+                day_ns = day * _NS_PER_DAY
+                last = conn.execute(_LAST_BLOCK_SQL, (instrument, day_ns)).fetchone()
+                if last is not None and last[1] < _BLOCK_TARGET:
+                    merged = list(zip(*_decode_columns(*last[1:]))) + rows
+                    conn.execute(_UPDATE_BLOCK_SQL, (*_encode_block(merged), last[0]))
+                else:
+                    conn.execute(
+                        _INSERT_BLOCK_SQL, (instrument, day_ns, *_encode_block(rows))
+                    )
+
+        self._run_write(write)
+        return len(ticks)
+
+    # Estos ticks no pasan por el trigger de ``ticks``: las barras se calculan
+    # al leer a partir de ``fetch_ticks_iter``.
+    fetch_tick_bars = StorageBackend.fetch_tick_bars
+
+    def fetch_ticks_iter(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[TickData]:
+        rows = self._select_rows(instrument, start, end, limit, order)
+        return (
+            TickData(
+                time=ns_to_datetime(time_ns),
+                bid=bid,
+                ask=ask,
+                last=last,
+                volume=volume,
+                instrument=instrument,
+            )
+            for instrument, time_ns, bid, ask, last, volume in rows
+        )
+
+    def fetch_ticks_soa(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Dict[str, np.ndarray]:
+        return _tick_columns(self._select_rows(instrument, start, end, limit, order))
+
+    def _select_rows(
+        self,
+        instrument: str | None,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int | None,
+        order: Order | None,
+    ) -> List[tuple]:
+        """Filas ``(instrument, time_ns, bid, ask, last, volume)`` ya ordenadas."""
+        descending, reverse = _resolve_order(order, limit)
+        start_ns = None if start is None else datetime_to_ns(start)
+        end_ns = None if end is None else datetime_to_ns(end)
+        query, params, _ = super()._tick_query(
+            instrument, start, end, None, "asc", raw_time=True
+        )
+        with self._reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+            blocks = conn.execute(*self._block_query(instrument, start_ns, end_ns))
+            for block in blocks:
+                rows.extend(_decode_block(block, start_ns, end_ns))
+        rows.sort(key=_by_time, reverse=descending)
+        if limit:
+            del rows[limit:]
+        if reverse:
+            rows.reverse()
+        return rows
+
+    def _block_query(
+        self,
+        instrument: str | None,
+        start_ns: int | None,
+        end_ns: int | None,
+    ) -> tuple[str, list[object]]:
+        query = (
+            "SELECT instrument, count, time_blob, bid_blob, ask_blob, last_blob,"
+            " volume_blob FROM tick_blocks"
+        )
+        clauses: list[str] = []
+        params: list[object] = []
+        if instrument:
+            clauses.append("instrument = ?")
+            params.append(instrument)
+        if start_ns is not None:
+            clauses.append("end_time >= ?")
+            params.append(start_ns)
+        if end_ns is not None:
+            clauses.append("start_time <= ?")
+            params.append(end_ns)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return query, params
+
+
+def _create_blocks(conn: sqlite3.Connection) -> None:
+    conn.execute(_CREATE_BLOCKS_SQL)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tick_blocks_instr_time"
+        " ON tick_blocks(instrument, start_time)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tick_blocks_instr_day"
+        " ON tick_blocks(instrument, day)"
+    )
+
+
+def _encode_block(rows: list[tuple]) -> tuple:
+    """``(start_time, end_time, count, blobs...)`` de filas ``(time_ns, ...)``."""
+    # Ordenados por tiempo los deltas son pequenos y comprimen mejor.
+    rows = sorted(rows, key=itemgetter(0))
+    times, bids, asks, lasts, volumes = zip(*rows)
+    return (
+        times[0],
+        times[-1],
+        len(rows),
+        encode_ints(times),
+        encode_floats(bids),
+        encode_floats(asks),
+        encode_floats(lasts),
+        encode_ints(volumes, order=1),
+    )
+
+
+def _decode_columns(
+    count: int,
+    time_blob: bytes,
+    bid_blob: bytes,
+    ask_blob: bytes,
+    last_blob: bytes,
+    volume_blob: bytes,
+) -> tuple[list, ...]:
+    """Columnas ``(time, bid, ask, last, volume)`` de un bloque, sin filtrar."""
+    return (
+        decode_ints(time_blob, count),
+        decode_floats(bid_blob, count),
+        decode_floats(ask_blob, count),
+        decode_floats(last_blob, count),
+        decode_ints(volume_blob, count, order=1),
+    )
+
+
+def _decode_block(
+    block: tuple, start_ns: int | None, end_ns: int | None
+) -> Iterator[tuple]:
+    instrument, *blobs = block
+    for time_ns, bid, ask, last, volume in zip(*_decode_columns(*blobs)):
+        if start_ns is not None and time_ns < start_ns:
+            continue
+        if end_ns is not None and time_ns > end_ns:
+            continue
+        yield (
+            instrument,
+            time_ns,
+            bid,
+            ask,
+            last,
+            None if volume == MISSING_VOLUME else volume,
+        )
+
+
+__all__ = ["CompressedTickStorageBackend"]
@@ -0,0 +1,185 @@
+﻿"""Codificacion estilo Gorilla para series de ticks.
+
+Implementa los dos esquemas del paper de Gorilla (Facebook, VLDB 2015):
+
+* enteros (timestamps, volumenes) como delta o delta-de-delta con prefijos de
+  longitud variable. Los buckets son mas anchos que los del paper porque aqui
+  los timestamps van en nanosegundos y no en segundos;
+* flotantes como XOR con el valor anterior, guardando solo los bits
+  significativos y reutilizando la ventana de ceros previa cuando cabe.
+
+Los precios ausentes (``None``) se codifican como ``NaN`` y se decodifican de
+vuelta a ``None``. Los decodificadores necesitan el numero de valores, que se
+guarda junto al bloque.
+"""
+from __future__ import annotations
+
+import math
+from typing import List, Sequence
+
+import numpy as np
+
+# (prefijo, bits del prefijo, bits del valor en zigzag). Un delta nulo ocupa un
+# unico bit ``0``.
+_INT_BUCKETS = (
+    (0b10, 2, 14),
+    (0b110, 3, 24),
+    (0b1110, 4, 36),
+    (0b1111, 4, 64),
+)
+
+
+class _BitWriter:
+    def __init__(self) -> None:
+        self._out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        self._acc = (self._acc << bits) | value
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self._out.append(self._acc >> self._bits)
+            self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self) -> bytes:
+        if self._bits:
+            return bytes(self._out) + bytes([self._acc << (8 - self._bits)])
+        return bytes(self._out)
+
+
+class _BitReader:
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._pos = 0
+        self._acc = 0
+        self._bits = 0
+
+    def read(self, bits: int) -> int:
+        while self._bits < bits:
+            self._acc = (self._acc << 8) | self._data[self._pos]
+            self._pos += 1
+            self._bits += 8
+        self._bits -= bits
+        value = self._acc >> self._bits
+        self._acc &= (1 << self._bits) - 1
+        return value
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_signed(writer: _BitWriter, value: int) -> None:
+    if value == 0:
+        writer.write(0, 1)
+        return
+    encoded = _zigzag(value)
+    for prefix, prefix_bits, bits in _INT_BUCKETS:
+        if encoded < 1 << bits:
+            writer.write(prefix, prefix_bits)
+            writer.write(encoded, bits)
+            return
+    raise OverflowError(f"Valor fuera del rango de 64 bits: {value}")
+
+
+def _read_signed(reader: _BitReader) -> int:
+    if not reader.read(1):
+        return 0
+    for _, _, bits in _INT_BUCKETS[:-1]:
+        if not reader.read(1):
+            return _unzigzag(reader.read(bits))
+    return _unzigzag(reader.read(_INT_BUCKETS[-1][2]))
+
+
+def encode_ints(values: Sequence[int], order: int = 2) -> bytes:
+    """Codifica enteros como delta (``order=1``) o delta-de-delta (``order=2``)."""
+    writer = _BitWriter()
+    previous = previous_delta = 0
+    for index, value in enumerate(values):
+        if index == 0:
+            writer.write(_zigzag(value), 64)
+        else:
+            delta = value - previous
+            _write_signed(writer, delta - previous_delta if order == 2 else delta)
+            previous_delta = delta
+        previous = value
+    return writer.getvalue()
+
+
+def decode_ints(data: bytes, count: int, order: int = 2) -> List[int]:
+    """Inversa de :func:`encode_ints`."""
+    if not count:
+        return []
+    reader = _BitReader(data)
+    value = _unzigzag(reader.read(64))
+    values = [value]
+    delta = 0
+    for _ in range(count - 1):
+        encoded = _read_signed(reader)
+        delta = delta + encoded if order == 2 else encoded
+        value += delta
+        values.append(value)
+    return values
+
+
+def encode_floats(values: Sequence[float | None]) -> bytes:
+    """Codifica flotantes haciendo XOR con el valor anterior."""
+    writer = _BitWriter()
+    raw = np.array(
+        [math.nan if value is None else value for value in values], dtype=np.float64
+    )
+    previous = 0
+    leading = trailing = -1
+    for index, bits in enumerate(raw.view(np.uint64).tolist()):
+        if index == 0:
+            writer.write(bits, 64)
+            previous = bits
+            continue
+        xor = bits ^ previous
+        previous = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if leading >= 0 and lead >= leading and trail >= trailing:
+            # Los bits significativos caben en la ventana del valor anterior.
+            writer.write(0b10, 2)
+            writer.write(xor >> trailing, 64 - leading - trailing)
+        else:
+            size = 64 - lead - trail
+            writer.write(0b11, 2)
+            writer.write(lead, 5)
+            writer.write(size & 0x3F, 6)
+            writer.write(xor >> trail, size)
+            leading, trailing = lead, trail
+    return writer.getvalue()
+
+
+def decode_floats(data: bytes, count: int) -> List[float | None]:
+    """Inversa de :func:`encode_floats`; ``NaN`` se devuelve como ``None``."""
+    if not count:
+        return []
+    reader = _BitReader(data)
+    previous = reader.read(64)
+    words = [previous]
+    leading = trailing = 0
+    for _ in range(count - 1):
+        if reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                size = reader.read(6) or 64
+                trailing = 64 - leading - size
+            previous ^= reader.read(64 - leading - trailing) << trailing
+        words.append(previous)
+    floats = np.array(words, dtype=np.uint64).view(np.float64).tolist()
+    return [None if math.isnan(value) else value for value in floats]
+
+
+__all__ = ["decode_floats", "decode_ints", "encode_floats", "encode_ints"]
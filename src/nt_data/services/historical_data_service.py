@@ -2,24 +2,57 @@
 from __future__ import annotations
 
 import logging
+import time
+from collections import OrderedDict
+from dataclasses import replace
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Tuple
 
 from ..connectors import ConnectionError, NinjaTraderClient
 from ..models.bar import BarData
 
 logger = logging.getLogger(__name__)
 
+_CacheKey = Tuple[str, str, str, str]
+
 
 class HistoricalDataService:
-    """Se encarga de orquestar la descarga de barras historicas."""
+    """Se encarga de orquestar la descarga de barras historicas.
+
+    Las respuestas se guardan en una cache LRU de ``cache_size`` entradas y las
+    consultas sin datos se recuerdan durante ``empty_ttl`` segundos para no
+    repetir descargas que ya se sabe que vuelven vacias. ``BarData`` es mutable,
+    asi que la cache guarda sus propias copias y entrega copias nuevas en cada
+    acierto: modificar las barras recibidas no altera las siguientes respuestas.
+    """
 
-    def __init__(self, client: NinjaTraderClient) -> None:
+    def __init__(
+        self,
+        client: NinjaTraderClient,
+        cache_size: int = 256,
+        empty_ttl: float = 60.0,
+    ) -> None:
         self._client = client
+        self._cache_size = cache_size
+        self._empty_ttl = empty_ttl
+        self._cache: OrderedDict[_CacheKey, Tuple[BarData, ...]] = OrderedDict()
+        self._empty_cache: Dict[_CacheKey, float] = {}
 
     def get_historical_bars(
         self, instrument: str, timeframe: str, start: datetime, end: datetime
     ) -> List[BarData]:
+        key = (instrument, timeframe, start.isoformat(), end.isoformat())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            logger.debug("Historicos servidos desde cache: %s", key)
+            return [replace(bar) for bar in cached]
+        now = time.monotonic()
+        empty_since = self._empty_cache.get(key)
+        if empty_since is not None and now - empty_since < self._empty_ttl:
+            logger.debug("Consulta sin datos reciente, se omite la descarga: %s", key)
+            return []
+
         if not self._client.is_connected:
             try:
                 self._client.connect()
@@ -33,7 +66,30 @@ class HistoricalDataService:
             start.isoformat(),
             end.isoformat(),
         )
-        return self._client.request_historical_data(instrument, timeframe, start, end)
+        bars = self._client.request_historical_data(instrument, timeframe, start, end)
+        self._remember(key, bars, now)
+        return bars
+
+    def clear_cache(self) -> None:
+        """Descarta las respuestas y consultas vacias memorizadas."""
+        self._cache.clear()
+        self._empty_cache.clear()
+
+    def _remember(self, key: _CacheKey, bars: List[BarData], now: float) -> None:
+        if not bars:
+            self._empty_cache = {
+                cached_key: since
+                for cached_key, since in self._empty_cache.items()
+                if now - since < self._empty_ttl
+            }
+            self._empty_cache[key] = now
+            return
+        self._empty_cache.pop(key, None)
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = tuple(replace(bar) for bar in bars)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
 
 
 __all__ = ["HistoricalDataService"]
\ No newline at end of file
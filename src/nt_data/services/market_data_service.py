@@ -4,7 +4,7 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from typing import Callable, List
+from typing import Callable, Tuple
 
 from ..connectors import ConnectionError, MarketDataCallback, NinjaTraderClient
 from ..models.tick import TickData
@@ -18,7 +18,7 @@ class MarketDataService:
     def __init__(self, client: NinjaTraderClient, reconnect_delay: float = 2.0) -> None:
         self._client = client
         self._reconnect_delay = reconnect_delay
-        self._subscriptions: List[Callable[[], None]] = []
+        self._subscriptions: Tuple[Callable[[], None], ...] = ()
         self._lock = threading.Lock()
 
     def ensure_connection(self) -> None:
@@ -53,17 +53,17 @@ class MarketDataService:
 
         cancel = self._client.subscribe_market_data(instrument, _on_tick)
         with self._lock:
-            self._subscriptions.append(cancel)
+            self._subscriptions = self._subscriptions + (cancel,)
         return cancel
 
     def stop_all(self) -> None:
         with self._lock:
-            for cancel in self._subscriptions:
-                try:
-                    cancel()
-                except Exception as exc:  # pragma: no cover
-                    logger.error("Error cancelando suscripcion: %s", exc)
-            self._subscriptions.clear()
+            subscriptions, self._subscriptions = self._subscriptions, ()
+        for cancel in subscriptions:
+            try:
+                cancel()
+            except Exception as exc:  # pragma: no cover
+                logger.error("Error cancelando suscripcion: %s", exc)
 
 
 __all__ = ["MarketDataService"]
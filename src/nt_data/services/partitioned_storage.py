@@ -0,0 +1,371 @@
+﻿"""Almacenamiento de ticks particionado por instrumento y periodo."""
+from __future__ import annotations
+
+import functools
+import heapq
+import itertools
+import operator
+import re
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Sequence
+
+import numpy as np
+
+from ..models.batch import datetime_to_ns, ns_to_datetime
+from ..models.tick import TickData
+from .storage_service import (
+    _CREATE_TICKS_SQL,
+    _FETCH_ARRAYSIZE,
+    _FILTERS,
+    _TICK_COLUMNS,
+    _TICK_FIELDS,
+    Order,
+    SQLiteStorageBackend,
+    StorageBackend,
+    _rebuild_table,
+    _resolve_order,
+    _tick_columns,
+    _time_filters,
+    _uses_autoincrement,
+    _with_time_alias,
+)
+
+_PERIODS = {"day", "month"}
+
+# Clave de mezcla: ``time`` es la segunda columna de ``_TICK_COLUMNS``.
+_ROW_TIME = operator.itemgetter(1)
+
+_CREATE_CHUNKS_SQL = """
+    CREATE TABLE IF NOT EXISTS tick_chunks (
+        name TEXT PRIMARY KEY,
+        instrument TEXT NOT NULL,
+        start_time INTEGER NOT NULL,
+        end_time INTEGER NOT NULL
+    )
+"""
+
+
+class TickChunk(NamedTuple):
+    """Tabla que guarda los ticks de un instrumento en ``[start, end)`` (ns)."""
+
+    name: str
+    instrument: str
+    start: int
+    end: int
+
+
+class ChunkRouter:
+    """Asigna a cada ``(instrumento, instante)`` su tabla de ticks.
+
+    Las tablas se llaman ``ticks_<instrumento>_<crc32>_<periodo>``: el
+    instrumento se normaliza a ``[a-z0-9_]`` y el CRC evita colisiones entre
+    nombres que se normalizan igual. ``period`` es ``"month"`` o ``"day"``.
+    """
+
+    def __init__(self, period: str = "month") -> None:
+        if period not in _PERIODS:
+            raise ValueError(f"period debe ser uno de {sorted(_PERIODS)}: {period}")
+        self._period = period
+        self._chunks: dict[tuple[str, int, int, int], TickChunk] = {}
+
+    def chunk_for(self, instrument: str, time: datetime) -> TickChunk:
+        moment = ns_to_datetime(datetime_to_ns(time))
+        day = moment.day if self._period == "day" else 1
+        key = (instrument, moment.year, moment.month, day)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = self._build_chunk(instrument, moment)
+        return chunk
+
+    def _build_chunk(self, instrument: str, moment: datetime) -> TickChunk:
+        if self._period == "day":
+            start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+            end = datetime.fromordinal(start.toordinal() + 1)
+            suffix = start.strftime("%Y%m%d")
+        else:
+            start = moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            end = start.replace(
+                year=start.year + start.month // 12, month=start.month % 12 + 1
+            )
+            suffix = start.strftime("%Y%m")
+        return TickChunk(
+            name=f"ticks_{_instrument_slug(instrument)}_{suffix}",
+            instrument=instrument,
+            start=datetime_to_ns(start),
+            end=datetime_to_ns(end),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _instrument_slug(instrument: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", instrument.lower()).strip("_")
+    return f"{slug}_{zlib.crc32(instrument.encode('utf-8')):08x}"
+
+
+class PartitionedSQLiteStorageBackend(SQLiteStorageBackend):
+    """Variante de :class:`SQLiteStorageBackend` con ticks en chunks.
+
+    Cada chunk es una tabla propia (ver :class:`ChunkRouter`) registrada en
+    ``tick_chunks``, de modo que el coste de una consulta depende solo de los
+    chunks que cubre su rango y la retencion se aplica con ``DROP TABLE`` en
+    ``drop_tick_chunks``. Las barras y los ticks ya presentes en la tabla
+    ``ticks`` se siguen sirviendo como en el backend base.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        synchronous: str = "NORMAL",
+        max_readers: int | None = None,
+        router: ChunkRouter | None = None,
+    ) -> None:
+        self._router = router or ChunkRouter()
+        super().__init__(db_path, synchronous=synchronous, max_readers=max_readers)
+
+    def _initialize(self) -> None:
+        super()._initialize()
+        self._run_write(lambda conn: conn.execute(_CREATE_CHUNKS_SQL))
+
+    def _migrate_to_rowid(self, conn: sqlite3.Connection) -> None:
+        super()._migrate_to_rowid(conn)
+        registry = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tick_chunks'"
+        ).fetchone()
+        if registry is None:
+            return
+        columns = f"id, {_TICK_COLUMNS}"
+        for (name,) in conn.execute("SELECT name FROM tick_chunks").fetchall():
+            if not _uses_autoincrement(conn, name):
+                continue
+            _rebuild_table(
+                conn, name, _CREATE_TICKS_SQL.format(table=name), columns, columns
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_time ON {name}(time)")
+
+    def save_ticks(self, ticks: Sequence[TickData]) -> int:
+        if not ticks:
+            return 0
+        groups: dict[TickChunk, list[tuple]] = {}
+        chunk_for = self._router.chunk_for
+        for instrument, time, bid, ask, last, volume in map(_TICK_FIELDS, ticks):
+            groups.setdefault(chunk_for(instrument, time), []).append(
+                (instrument, datetime_to_ns(time), bid, ask, last, volume)
+            )
+
+        def insert(conn: sqlite3.Connection) -> None:
+            for chunk, rows in groups.items():
+                # IF NOT EXISTS en cada lote: si una transaccion se revierte no
+                # queda ninguna cache en memoria apuntando a una tabla inexistente.
+                conn.execute(_CREATE_TICKS_SQL.format(table=chunk.name))
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{chunk.name}_time"
+                    f" ON {chunk.name}(time)"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO tick_chunks"
+                    " (name, instrument, start_time, end_time) VALUES (?, ?, ?, ?)",
+                    chunk,
+                )
+                conn.executemany(_insert_sql(chunk.name), rows)
+
+        self._run_write(insert)
+        return len(ticks)
+
+    # Estos ticks no pasan por el trigger de ``ticks``: las barras se calculan
+    # al leer a partir de ``fetch_ticks_iter``.
+    fetch_tick_bars = StorageBackend.fetch_tick_bars
+
+    def tick_chunks(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> List[TickChunk]:
+        """Chunks que pueden contener ticks del rango pedido, por orden temporal."""
+        query = "SELECT name, instrument, start_time, end_time FROM tick_chunks"
+        clauses: list[str] = []
+        params: list[object] = []
+        if instrument:
+            clauses.append("instrument = ?")
+            params.append(instrument)
+        if start is not None:
+            clauses.append("end_time > ?")
+            params.append(datetime_to_ns(start))
+        if end is not None:
+            clauses.append("start_time <= ?")
+            params.append(datetime_to_ns(end))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY start_time, name"
+        with self._reader() as conn:
+            return [TickChunk(*row) for row in conn.execute(query, params)]
+
+    def drop_tick_chunks(self, before: datetime, instrument: str | None = None) -> int:
+        """Elimina los chunks que terminan antes de ``before``; devuelve cuantos."""
+        chunks = [
+            chunk
+            for chunk in self.tick_chunks(instrument)
+            if chunk.end <= datetime_to_ns(before)
+        ]
+
+        def drop(conn: sqlite3.Connection) -> None:
+            for chunk in chunks:
+                conn.execute(f"DROP TABLE IF EXISTS {chunk.name}")
+                conn.execute("DELETE FROM tick_chunks WHERE name = ?", (chunk.name,))
+
+        self._run_write(drop)
+        return len(chunks)
+
+    def fetch_ticks_iter(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[TickData]:
+        rows = self._tick_rows(instrument, start, end, limit, order)
+        return map(self._row_to_tick, rows)
+
+    def fetch_ticks_soa(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Dict[str, np.ndarray]:
+        rows = self._tick_rows(instrument, start, end, limit, order, raw_time=True)
+        return _tick_columns(list(rows))
+
+    def _tick_rows(
+        self,
+        instrument: str | None,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int | None,
+        order: Order | None,
+        raw_time: bool = False,
+    ) -> Iterator[tuple]:
+        """Filas de ``ticks`` y de los chunks del rango, mezcladas por ``time``.
+
+        Cada tabla se consulta por separado (un ``UNION ALL`` de todas supera el
+        limite de 500 terminos de SQLite) y sus filas, ya ordenadas, se mezclan
+        con :func:`heapq.merge`. Con ``limit`` los chunks se recorren desde el
+        extremo pedido y se dejan de consultar al reunir ``limit`` filas.
+        """
+        descending, reverse = _resolve_order(order, limit)
+        filters = _time_filters(start, end)
+        filters["instrument"] = instrument or None
+        active = frozenset(name for name, value in filters.items() if value is not None)
+        params = [filters[name] for name, _ in _FILTERS if name in active]
+        if limit:
+            params.append(limit)
+        template = _chunk_sql(active, bool(limit), descending, raw_time)
+        clusters = _overlapping_chunks(self.tick_chunks(instrument, start, end))
+        if descending:
+            clusters.reverse()
+        return self._merge_sources(
+            template, params, clusters, limit, descending, reverse
+        )
+
+    def _merge_sources(
+        self,
+        template: str,
+        params: list[object],
+        clusters: list[list[TickChunk]],
+        limit: int | None,
+        descending: bool,
+        reverse: bool,
+    ) -> Iterator[tuple]:
+        opened: list[Iterator[tuple]] = []
+        with self._reader() as conn:
+
+            def source(table: str) -> Iterator[tuple]:
+                rows = _cursor_rows(conn, template.format(table=table), params)
+                opened.append(rows)
+                return rows
+
+            def merge(tables: Iterator[str]) -> Iterator[tuple]:
+                return heapq.merge(
+                    *map(source, tables), key=_ROW_TIME, reverse=descending
+                )
+
+            # Los grupos no se solapan en el tiempo: basta con encadenarlos, y
+            # cada uno solo se consulta cuando la mezcla llega a el.
+            chunk_rows = itertools.chain.from_iterable(
+                merge(chunk.name for chunk in cluster) for cluster in clusters
+            )
+            # La tabla ``ticks`` original tambien se consulta: puede tener datos
+            # previos a los chunks.
+            rows = heapq.merge(
+                source("ticks"), chunk_rows, key=_ROW_TIME, reverse=descending
+            )
+            if limit:
+                rows = itertools.islice(rows, limit)
+            try:
+                if reverse:
+                    yield from reversed(list(rows))
+                else:
+                    yield from rows
+            finally:
+                for cursor_rows in opened:
+                    cursor_rows.close()
+
+
+@functools.lru_cache(maxsize=64)
+def _insert_sql(table: str) -> str:
+    return f"INSERT INTO {table} ({_TICK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+@functools.lru_cache(maxsize=16)
+def _chunk_sql(
+    active: frozenset[str], has_limit: bool, descending: bool, raw_time: bool
+) -> str:
+    """SELECT ordenado de una tabla de ticks, con ``{table}`` por sustituir."""
+    columns = _TICK_COLUMNS if raw_time else _with_time_alias(_TICK_COLUMNS)
+    query = f"SELECT {columns} FROM {{table}}"
+    clauses = [clause for name, clause in _FILTERS if name in active]
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY time DESC" if descending else " ORDER BY time"
+    if has_limit:
+        query += " LIMIT ?"
+    return query
+
+
+def _overlapping_chunks(chunks: Sequence[TickChunk]) -> list[list[TickChunk]]:
+    """Agrupa los chunks (ordenados por inicio) cuyos rangos se solapan.
+
+    Los grupos resultantes son disjuntos en el tiempo, asi que nunca hay mas
+    cursores abiertos a la vez que chunks simultaneos (uno por instrumento).
+    """
+    clusters: list[list[TickChunk]] = []
+    cluster_end = 0
+    for chunk in chunks:
+        if clusters and chunk.start < cluster_end:
+            clusters[-1].append(chunk)
+            cluster_end = max(cluster_end, chunk.end)
+        else:
+            clusters.append([chunk])
+            cluster_end = chunk.end
+    return clusters
+
+
+def _cursor_rows(
+    conn: sqlite3.Connection, query: str, params: list[object]
+) -> Iterator[tuple]:
+    """Ejecuta ``query`` al pedir la primera fila y entrega el resto por bloques."""
+    cursor = conn.execute(query, params)
+    cursor.arraysize = _FETCH_ARRAYSIZE
+    try:
+        while rows := cursor.fetchmany():
+            yield from rows
+    finally:
+        cursor.close()
+
+
+__all__ = ["ChunkRouter", "PartitionedSQLiteStorageBackend", "TickChunk"]
@@ -1,19 +1,176 @@
 ﻿"""Servicio de persistencia mediante SQLite."""
 from __future__ import annotations
 
+import atexit
+import functools
 import logging
+import os
+import queue
 import sqlite3
 import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
-from datetime import datetime
+from concurrent.futures import Future, InvalidStateError
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Sequence
+from typing import Callable, Dict, Iterator, List, Literal, Sequence
 
+import numpy as np
+import pandas as pd
+
+from ..connectors.ninjatrader_client import _timeframe_to_timedelta
 from ..models.bar import BarData
+from ..models.batch import (
+    MISSING_VOLUME,
+    BarBatch,
+    InternTable,
+    TickBatch,
+    datetime_to_ns,
+    instrument_table,
+    ns_to_datetime,
+    timeframe_table,
+)
 from ..models.tick import TickData
 
 logger = logging.getLogger(__name__)
 
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+# Orden de los resultados de ``fetch_*``. Sin orden explicito se devuelven en
+# orden cronologico; si ademas hay ``limit``, son los ``limit`` mas recientes.
+Order = Literal["asc", "desc"]
+
+# Version del esquema guardada en ``PRAGMA user_version``.
+# 1: ``time`` como INTEGER en nanosegundos desde epoch (UTC).
+# 2: barras de 1 minuto ``tick_bars_1m`` mantenidas por trigger desde ``ticks``.
+# 3: ``id`` como alias de ROWID, sin ``AUTOINCREMENT``.
+_SCHEMA_VERSION = 3
+
+# Plantilla: ``{table}`` es ``ticks`` o el nombre de un chunk particionado.
+_CREATE_TICKS_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        instrument TEXT NOT NULL,
+        time INTEGER NOT NULL,
+        bid REAL,
+        ask REAL,
+        last REAL,
+        volume INTEGER
+    )
+"""
+_CREATE_BARS_SQL = """
+    CREATE TABLE IF NOT EXISTS bars (
+        id INTEGER PRIMARY KEY,
+        instrument TEXT NOT NULL,
+        timeframe TEXT NOT NULL,
+        time INTEGER NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        volume INTEGER NOT NULL
+    )
+"""
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+# Agregado continuo de ``ticks`` (precio ``last``) en barras de 1 minuto. Las
+# columnas ``open_time``/``close_time`` admiten ticks que llegan desordenados.
+_CREATE_TICK_BARS_SQL = """
+    CREATE TABLE IF NOT EXISTS tick_bars_1m (
+        instrument TEXT NOT NULL,
+        minute INTEGER NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        volume INTEGER NOT NULL,
+        open_time INTEGER NOT NULL,
+        close_time INTEGER NOT NULL,
+        PRIMARY KEY (instrument, minute)
+    ) WITHOUT ROWID
+"""
+_TICK_BARS_INSERT = """
+    INSERT INTO tick_bars_1m (
+        instrument, minute, open, high, low, close, volume, open_time, close_time
+    )
+"""
+# En DO UPDATE las columnas sin ``excluded.`` tienen el valor previo a la
+# actualizacion, asi que el orden de las asignaciones no importa.
+_TICK_BARS_UPSERT = """
+    ON CONFLICT (instrument, minute) DO UPDATE SET
+        open = CASE WHEN excluded.open_time < open_time
+            THEN excluded.open ELSE open END,
+        high = MAX(high, excluded.high),
+        low = MIN(low, excluded.low),
+        close = CASE WHEN excluded.close_time >= close_time
+            THEN excluded.close ELSE close END,
+        volume = volume + excluded.volume,
+        open_time = MIN(open_time, excluded.open_time),
+        close_time = MAX(close_time, excluded.close_time)
+"""
+_TICK_BARS_TRIGGER_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS trg_ticks_bars_1m AFTER INSERT ON ticks"
+    " WHEN NEW.last IS NOT NULL BEGIN"
+    + _TICK_BARS_INSERT
+    + f"""
+    VALUES (
+        NEW.instrument, NEW.time - NEW.time % {_NS_PER_MINUTE},
+        NEW.last, NEW.last, NEW.last, NEW.last, COALESCE(NEW.volume, 0),
+        NEW.time, NEW.time
+    )"""
+    + _TICK_BARS_UPSERT
+    + "; END"
+)
+_TICK_BARS_BACKFILL_SQL = (
+    _TICK_BARS_INSERT
+    + f"""
+    SELECT
+        instrument, time - time % {_NS_PER_MINUTE},
+        last, last, last, last, COALESCE(volume, 0), time, time
+    FROM ticks WHERE last IS NOT NULL ORDER BY time"""
+    + _TICK_BARS_UPSERT
+)
+
+_TICK_COLUMNS = "instrument, time, bid, ask, last, volume"
+_BAR_COLUMNS = "instrument, timeframe, time, open, high, low, close, volume"
+
+# Extraen todos los campos de una fila con una sola llamada en C.
+_TICK_FIELDS = attrgetter("instrument", "time", "bid", "ask", "last", "volume")
+_BAR_FIELDS = attrgetter(
+    "instrument", "timeframe", "time", "open", "high", "low", "close", "volume"
+)
+
+_INSERT_TICK_SQL = (
+    f"INSERT INTO ticks ({_TICK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_INSERT_BAR_SQL = (
+    f"INSERT INTO bars ({_BAR_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Cada conexion guarda preparadas las sentencias recientes; las consultas se
+# generan con texto identico para cada forma de filtro y asi aciertan siempre.
+_CACHED_STATEMENTS = 256
+# Filas leidas por cada ``fetchmany`` en las lecturas en streaming.
+_FETCH_ARRAYSIZE = 1000
+# Intentos de una escritura que falla con la base bloqueada (tras agotar
+# ``busy_timeout``) y espera antes del primer reintento; se duplica en cada uno.
+_WRITE_ATTEMPTS = 3
+_WRITE_BACKOFF = 0.05
+# Cada cuanto comprueba el hilo escritor inactivo si su servicio sigue vivo.
+_IDLE_POLL = 0.5
+
+# Lotes columnares (ver ``nt_data.models.batch``) con camino de insercion propio.
+_BATCH_TYPES = (TickBatch, BarBatch)
+
+# Con PARSE_COLNAMES, sqlite3 aplica el conversor registrado para ``nt_ns`` a la
+# columna aliasada y las filas llegan ya con ``datetime``.
+_TIME_CONVERTER = "nt_ns"
+_SELECT_TIME = f'time AS "time [{_TIME_CONVERTER}]"'
+sqlite3.register_converter(_TIME_CONVERTER, lambda value: ns_to_datetime(int(value)))
+
 
 class StorageBackend(ABC):
     @abstractmethod
@@ -31,6 +188,7 @@ class StorageBackend(ABC):
         start: datetime | None = None,
         end: datetime | None = None,
         limit: int | None = None,
+        order: Order | None = None,
     ) -> List[TickData]:
         raise NotImplementedError
 
@@ -42,109 +200,381 @@ class StorageBackend(ABC):
         start: datetime | None = None,
         end: datetime | None = None,
         limit: int | None = None,
+        order: Order | None = None,
     ) -> List[BarData]:
         raise NotImplementedError
 
+    def fetch_ticks_iter(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[TickData]:
+        """Recorre los ticks sin cargarlos todos; por defecto usa ``fetch_ticks``."""
+        return iter(self.fetch_ticks(instrument, start, end, limit, order))
+
+    def fetch_bars_iter(
+        self,
+        instrument: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[BarData]:
+        """Recorre las barras sin cargarlas todas; por defecto usa ``fetch_bars``."""
+        return iter(self.fetch_bars(instrument, timeframe, start, end, limit, order))
+
+    def fetch_ticks_soa(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Dict[str, np.ndarray]:
+        """Devuelve los ticks como columnas NumPy (ver :func:`_tick_columns`).
+
+        La implementacion por defecto parte de ``fetch_ticks``; los backends
+        pueden construir las columnas directamente desde sus filas.
+        """
+        rows = [
+            (instrument, datetime_to_ns(time), bid, ask, last, volume)
+            for instrument, time, bid, ask, last, volume in map(
+                _TICK_FIELDS, self.fetch_ticks(instrument, start, end, limit, order)
+            )
+        ]
+        return _tick_columns(rows)
+
+    def fetch_tick_bars(
+        self,
+        instrument: str | None = None,
+        timeframe: str = "1m",
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> List[BarData]:
+        """Barras OHLCV del precio ``last`` agrupando ``fetch_ticks_iter``.
+
+        ``timeframe`` debe ser un multiplo de un minuto y ``start``/``end``
+        filtran por el minuto de cada tick, igual que el agregado que mantiene
+        :class:`SQLiteStorageBackend`. Esta version recorre los ticks del rango.
+        """
+        bucket_ns = _timeframe_minutes(timeframe) * _NS_PER_MINUTE
+        if start is not None:
+            first_minute = -(-datetime_to_ns(start) // _NS_PER_MINUTE) * _NS_PER_MINUTE
+            start = ns_to_datetime(first_minute)
+        if end is not None:
+            next_minute = (datetime_to_ns(end) // _NS_PER_MINUTE + 1) * _NS_PER_MINUTE
+            end = ns_to_datetime(next_minute) - timedelta(microseconds=1)
+        buckets: dict[tuple[str, int], list] = {}
+        for tick in self.fetch_ticks_iter(instrument, start, end, order="asc"):
+            if tick.last is None:
+                continue
+            time_ns = datetime_to_ns(tick.time)
+            key = (tick.instrument, time_ns - time_ns % bucket_ns)
+            bar = buckets.get(key)
+            if bar is None:
+                bar = buckets[key] = [tick.last, tick.last, tick.last, tick.last, 0]
+            bar[1] = max(bar[1], tick.last)
+            bar[2] = min(bar[2], tick.last)
+            bar[3] = tick.last
+            bar[4] += tick.volume or 0
+        descending, reverse = _resolve_order(order, limit)
+        items = list(buckets.items())
+        if descending:
+            items.reverse()
+        bars = [
+            BarData(
+                time=ns_to_datetime(bucket),
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                volume=volume,
+                instrument=row_instrument,
+                timeframe=timeframe,
+            )
+            for (row_instrument, bucket), (open_, high, low, close, volume) in islice(
+                items, limit or None
+            )
+        ]
+        if reverse:
+            bars.reverse()
+        return bars
+
+    def fetch_ticks_df(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> pd.DataFrame:
+        """Ticks en un ``DataFrame`` construido a partir de ``fetch_ticks_soa``.
+
+        ``volume`` usa el tipo entero anulable ``Int64`` (``<NA>`` si falta).
+        """
+        frame = pd.DataFrame(self.fetch_ticks_soa(instrument, start, end, limit, order))
+        volume = frame["volume"].to_numpy()
+        frame["volume"] = pd.array(volume, dtype="Int64")
+        frame.loc[volume == MISSING_VOLUME, "volume"] = pd.NA
+        return frame
+
+    def fetch_bars_df(
+        self,
+        instrument: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> pd.DataFrame:
+        """Barras en un ``DataFrame``; por defecto a partir de ``fetch_bars``."""
+        rows = [
+            (instrument, timeframe, datetime_to_ns(time), open_, high, low, close, volume)
+            for instrument, timeframe, time, open_, high, low, close, volume in map(
+                _BAR_FIELDS,
+                self.fetch_bars(instrument, timeframe, start, end, limit, order),
+            )
+        ]
+        return _bar_frame(rows)
+
+    def close(self) -> None:
+        """Libera los recursos del backend (conexiones, archivos...)."""
+
 
 class SQLiteStorageBackend(StorageBackend):
-    """Backend que persiste datos en archivos SQLite."""
+    """Backend que persiste datos en archivos SQLite.
+
+    Usa una unica conexion de escritura, serializada con ``_lock``, y un pool
+    de hasta ``max_readers`` conexiones de solo lectura (por defecto una por
+    CPU) que en modo WAL no se bloquean entre si ni con el escritor. Los
+    iteradores de ``fetch_*_iter`` retienen su conexion hasta agotarse; si el
+    pool esta ocupado, otra lectura (incluida una anidada en el mismo hilo) abre
+    una conexion temporal en lugar de esperar, de modo que nunca se bloquea.
 
-    def __init__(self, db_path: str | Path) -> None:
+    ``synchronous`` fija el ``PRAGMA synchronous`` de cada conexion. ``NORMAL``
+    es el equilibrio recomendado en modo WAL; ``OFF`` solo tiene sentido para
+    bases desechables (tests, pruebas de carga).
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        synchronous: str = "NORMAL",
+        max_readers: int | None = None,
+    ) -> None:
+        synchronous = synchronous.upper()
+        if synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"synchronous debe ser uno de {sorted(_SYNCHRONOUS_MODES)}: {synchronous}"
+            )
+        self._synchronous = synchronous
         self._db_path = Path(db_path)
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
         self._lock = threading.Lock()
+        self._max_readers = max(1, max_readers or os.cpu_count() or 1)
+        self._readers: queue.Queue[sqlite3.Connection] = queue.Queue()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer = self._connect()
+        self._connections.append(self._writer)
+        atexit.register(_close_backend, weakref.ref(self))
         self._initialize()
 
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._readers = queue.Queue()
+        for conn in connections:
+            conn.close()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Toma una conexion de lectura del pool, abriendola si aun hay cupo.
+
+        Con el pool agotado se usa una conexion temporal que se cierra al salir.
+        """
+        temporary = False
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._connections_lock:
+                can_open = len(self._connections) - 1 < self._max_readers
+                conn = self._connect(read_only=True) if can_open else None
+                if conn is not None:
+                    self._connections.append(conn)
+            if conn is None:
+                conn = self._connect(read_only=True)
+                temporary = True
+        try:
+            yield conn
+        finally:
+            if temporary:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        # isolation_level=None: el modulo sqlite3 no abre transacciones implicitas;
+        # las escrituras las delimitan explicitamente con _write_transaction.
+        conn = sqlite3.connect(
+            self._db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            detect_types=sqlite3.PARSE_COLNAMES,
+            cached_statements=_CACHED_STATEMENTS,
+        )
         conn.execute("PRAGMA journal_mode=WAL;")
+        # En WAL, NORMAL solo sincroniza en los checkpoints y no en cada commit.
+        conn.execute(f"PRAGMA synchronous={self._synchronous};")
+        conn.execute("PRAGMA cache_size=-65536;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA busy_timeout=5000;")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON;")
         return conn
 
-    def _initialize(self) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS ticks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    instrument TEXT NOT NULL,
-                    time TEXT NOT NULL,
-                    bid REAL,
-                    ask REAL,
-                    last REAL,
-                    volume INTEGER
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS bars (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    instrument TEXT NOT NULL,
-                    timeframe TEXT NOT NULL,
-                    time TEXT NOT NULL,
-                    open REAL NOT NULL,
-                    high REAL NOT NULL,
-                    low REAL NOT NULL,
-                    close REAL NOT NULL,
-                    volume INTEGER NOT NULL
+    @contextmanager
+    def _write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """Ejecuta el bloque dentro de ``BEGIN IMMEDIATE``/``COMMIT``."""
+        with self._lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                # Un COMMIT que falla por bloqueo deja la transaccion abierta.
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _run_write(self, work: Callable[[sqlite3.Connection], object]) -> None:
+        """Ejecuta ``work`` en una transaccion de escritura con reintentos.
+
+        ``busy_timeout`` ya espera a que otro proceso libere la base; si aun asi
+        SQLite responde ``locked``/``busy``, la transaccion entera se repite con
+        espera exponencial hasta ``_WRITE_ATTEMPTS`` veces. ``work`` puede
+        llamarse mas de una vez, asi que debe generar sus filas en cada llamada.
+        """
+        for attempt in range(_WRITE_ATTEMPTS):
+            try:
+                with self._write_transaction() as conn:
+                    work(conn)
+                return
+            except sqlite3.OperationalError as exc:
+                if attempt == _WRITE_ATTEMPTS - 1 or not _is_busy_error(exc):
+                    raise
+                delay = _WRITE_BACKOFF * 2**attempt
+                logger.warning(
+                    "Base de datos ocupada, reintentando en %.2fs: %s", delay, exc
                 )
-                """
+                time.sleep(delay)
+
+    def _initialize(self) -> None:
+        self._run_write(self._create_schema)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Crea el esquema y aplica las migraciones pendientes (``user_version``)."""
+        conn.execute(_CREATE_TICKS_SQL.format(table="ticks"))
+        conn.execute(_CREATE_BARS_SQL)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._migrate_time_to_integer(conn)
+        if version < 3:
+            self._migrate_to_rowid(conn)
+        # Las consultas filtran por instrumento (y timeframe) y ordenan por
+        # tiempo: estos indices resuelven ambos sin recorrer ni ordenar la tabla.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ticks_instr_time ON ticks(instrument, time)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bars_instr_tf_time"
+            " ON bars(instrument, timeframe, time)"
+        )
+        conn.execute(_CREATE_TICK_BARS_SQL)
+        conn.execute(_TICK_BARS_TRIGGER_SQL)
+        if version < 2:
+            # Bases anteriores al agregado: se calcula con los ticks existentes.
+            conn.execute(_TICK_BARS_BACKFILL_SQL)
+        conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+
+    def _migrate_time_to_integer(self, conn: sqlite3.Connection) -> None:
+        """Convierte bases antiguas con ``time`` en ISO-8601 a nanosegundos."""
+        conn.create_function("nt_iso_to_ns", 1, _iso_to_ns, deterministic=True)
+        for table, create_sql, columns in (
+            ("ticks", _CREATE_TICKS_SQL.format(table="ticks"), _TICK_COLUMNS),
+            ("bars", _CREATE_BARS_SQL, _BAR_COLUMNS),
+        ):
+            if _column_type(conn, table, "time") != "TEXT":
+                continue
+            logger.info("Migrando la columna time de %s a INTEGER", table)
+            select = ", ".join(
+                "nt_iso_to_ns(time)" if name == "time" else name
+                for name in columns.split(", ")
             )
-            conn.commit()
+            _rebuild_table(conn, table, create_sql, columns, select)
+
+    def _migrate_to_rowid(self, conn: sqlite3.Connection) -> None:
+        """Quita ``AUTOINCREMENT`` de ``id`` en bases creadas con el esquema antiguo.
+
+        ``AUTOINCREMENT`` obliga a actualizar ``sqlite_sequence`` en cada insercion
+        y ``id`` no se usa para nada mas que identificar la fila: basta el ROWID.
+        """
+        for table, create_sql, columns in (
+            ("ticks", _CREATE_TICKS_SQL.format(table="ticks"), _TICK_COLUMNS),
+            ("bars", _CREATE_BARS_SQL, _BAR_COLUMNS),
+        ):
+            if _uses_autoincrement(conn, table):
+                logger.info("Eliminando AUTOINCREMENT de %s", table)
+                columns = f"id, {columns}"
+                _rebuild_table(conn, table, create_sql, columns, columns)
 
     def save_ticks(self, ticks: Sequence[TickData]) -> int:
         if not ticks:
             return 0
-        rows = [
-            (
-                tick.instrument,
-                tick.time.isoformat(),
-                tick.bid,
-                tick.ask,
-                tick.last,
-                tick.volume,
-            )
-            for tick in ticks
-        ]
-        with self._lock, self._connect() as conn:
-            conn.executemany(
-                """
-                INSERT INTO ticks (instrument, time, bid, ask, last, volume)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                rows,
+        if isinstance(ticks, TickBatch):
+            # Filas sacadas de las columnas, sin reconstruir un TickData por tick.
+            batch_rows = _tick_batch_rows(ticks)
+            self._run_write(lambda conn: conn.executemany(_INSERT_TICK_SQL, batch_rows))
+            return len(ticks)
+
+        def insert(conn: sqlite3.Connection) -> None:
+            # Generador: executemany consume las filas de una en una sin
+            # materializar una lista paralela a ``ticks``.
+            rows = (
+                (instrument, datetime_to_ns(time), bid, ask, last, volume)
+                for instrument, time, bid, ask, last, volume in map(_TICK_FIELDS, ticks)
             )
-            conn.commit()
-        return len(rows)
+            conn.executemany(_INSERT_TICK_SQL, rows)
+
+        self._run_write(insert)
+        return len(ticks)
 
     def save_bars(self, bars: Sequence[BarData]) -> int:
         if not bars:
             return 0
-        rows = [
-            (
-                bar.instrument,
-                bar.timeframe,
-                bar.time.isoformat(),
-                bar.open,
-                bar.high,
-                bar.low,
-                bar.close,
-                bar.volume,
-            )
-            for bar in bars
-        ]
-        with self._lock, self._connect() as conn:
-            conn.executemany(
-                """
-                INSERT INTO bars (
-                    instrument, timeframe, time, open, high, low, close, volume
+        if isinstance(bars, BarBatch):
+            batch_rows = _bar_batch_rows(bars)
+            self._run_write(lambda conn: conn.executemany(_INSERT_BAR_SQL, batch_rows))
+            return len(bars)
+
+        def insert(conn: sqlite3.Connection) -> None:
+            rows = (
+                (instrument, timeframe, datetime_to_ns(time), open_, high, low, close, vol)
+                for instrument, timeframe, time, open_, high, low, close, vol in map(
+                    _BAR_FIELDS, bars
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                rows,
             )
-            conn.commit()
-        return len(rows)
+            conn.executemany(_INSERT_BAR_SQL, rows)
+
+        self._run_write(insert)
+        return len(bars)
 
     def fetch_ticks(
         self,
@@ -152,28 +582,50 @@ class SQLiteStorageBackend(StorageBackend):
         start: datetime | None = None,
         end: datetime | None = None,
         limit: int | None = None,
+        order: Order | None = None,
     ) -> List[TickData]:
-        query = "SELECT instrument, time, bid, ask, last, volume FROM ticks"
-        clauses: list[str] = []
-        params: list[object] = []
-        if instrument:
-            clauses.append("instrument = ?")
-            params.append(instrument)
-        if start:
-            clauses.append("time >= ?")
-            params.append(start.isoformat())
-        if end:
-            clauses.append("time <= ?")
-            params.append(end.isoformat())
-        if clauses:
-            query += " WHERE " + " AND ".join(clauses)
-        query += " ORDER BY time"
-        if limit:
-            query += " LIMIT ?"
-            params.append(limit)
-        with self._connect() as conn:
+        return list(self.fetch_ticks_iter(instrument, start, end, limit, order))
+
+    def fetch_ticks_iter(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[TickData]:
+        query, params, reverse = self._tick_query(instrument, start, end, limit, order)
+        return map(self._row_to_tick, self._iter_rows(query, params, reverse))
+
+    def fetch_ticks_soa(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Dict[str, np.ndarray]:
+        query, params, reverse = self._tick_query(
+            instrument, start, end, limit, order, raw_time=True
+        )
+        with self._reader() as conn:
             rows = conn.execute(query, params).fetchall()
-        return [self._row_to_tick(row) for row in rows]
+        if reverse:
+            rows.reverse()
+        return _tick_columns(rows)
+
+    def _tick_query(
+        self,
+        instrument: str | None,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int | None,
+        order: Order | None,
+        raw_time: bool = False,
+    ) -> tuple[str, list[object], bool]:
+        filters = _time_filters(start, end)
+        filters["instrument"] = instrument or None
+        return _filter_query("ticks", filters, limit, order, raw_time)
 
     def fetch_bars(
         self,
@@ -182,39 +634,154 @@ class SQLiteStorageBackend(StorageBackend):
         start: datetime | None = None,
         end: datetime | None = None,
         limit: int | None = None,
+        order: Order | None = None,
     ) -> List[BarData]:
-        query = (
-            "SELECT instrument, timeframe, time, open, high, low, close, volume"
-            " FROM bars"
+        return list(
+            self.fetch_bars_iter(instrument, timeframe, start, end, limit, order)
+        )
+
+    def fetch_bars_iter(
+        self,
+        instrument: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[BarData]:
+        query, params, reverse = self._bar_query(
+            instrument, timeframe, start, end, limit, order
+        )
+        return map(self._row_to_bar, self._iter_rows(query, params, reverse))
+
+    def _iter_rows(
+        self, query: str, params: list[object], reverse: bool = False
+    ) -> Iterator[tuple]:
+        """Entrega las filas por bloques de ``_FETCH_ARRAYSIZE`` con ``fetchmany``.
+
+        La conexion lectora queda ocupada hasta agotar (o cerrar) el iterador.
+        Con ``reverse`` (consultas de cola, acotadas por ``limit``) las filas se
+        leen completas y se entregan en orden inverso.
+        """
+        if reverse:
+            with self._reader() as conn:
+                rows = conn.execute(query, params).fetchall()
+            yield from reversed(rows)
+            return
+        with self._reader() as conn:
+            cursor = conn.execute(query, params)
+            cursor.arraysize = _FETCH_ARRAYSIZE
+            try:
+                while rows := cursor.fetchmany():
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def _bar_query(
+        self,
+        instrument: str | None,
+        timeframe: str | None,
+        start: datetime | None,
+        end: datetime | None,
+        limit: int | None,
+        order: Order | None,
+        raw_time: bool = False,
+    ) -> tuple[str, list[object], bool]:
+        filters = _time_filters(start, end)
+        filters["instrument"] = instrument or None
+        filters["timeframe"] = timeframe or None
+        return _filter_query("bars", filters, limit, order, raw_time)
+
+    def fetch_bars_df(
+        self,
+        instrument: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> pd.DataFrame:
+        query, params, reverse = self._bar_query(
+            instrument, timeframe, start, end, limit, order, raw_time=True
         )
-        clauses: list[str] = []
-        params: list[object] = []
-        if instrument:
-            clauses.append("instrument = ?")
-            params.append(instrument)
-        if timeframe:
-            clauses.append("timeframe = ?")
-            params.append(timeframe)
-        if start:
-            clauses.append("time >= ?")
-            params.append(start.isoformat())
-        if end:
-            clauses.append("time <= ?")
-            params.append(end.isoformat())
-        if clauses:
-            query += " WHERE " + " AND ".join(clauses)
-        query += " ORDER BY time"
-        if limit:
-            query += " LIMIT ?"
-            params.append(limit)
-        with self._connect() as conn:
+        with self._reader() as conn:
             rows = conn.execute(query, params).fetchall()
-        return [self._row_to_bar(row) for row in rows]
+        if reverse:
+            rows.reverse()
+        return _bar_frame(rows)
+
+    def fetch_tick_bars(
+        self,
+        instrument: str | None = None,
+        timeframe: str = "1m",
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> List[BarData]:
+        """Barras OHLCV del precio ``last`` calculadas a partir de ``ticks``.
+
+        Se leen del agregado ``tick_bars_1m`` que mantiene el trigger sobre
+        ``ticks``: una fila por minuto en lugar de un tick entero. Los timeframes
+        mayores (multiplos de un minuto) se agrupan al leer. ``start`` y ``end``
+        filtran por el minuto de cada fila.
+        """
+        bucket_ns = _timeframe_minutes(timeframe) * _NS_PER_MINUTE
+        descending, reverse = _resolve_order(order, limit)
+        filters = _time_filters(start, end)
+        filters["instrument"] = instrument or None
+        active = frozenset(name for name, value in filters.items() if value is not None)
+        params = [filters[name] for name, _ in _TICK_BARS_FILTERS if name in active]
+        # Con un solo instrumento cada barra ocupa como mucho ``bucket`` filas:
+        # leyendo ``limit + 1`` barras completas basta con descartar la ultima,
+        # que puede haber quedado cortada.
+        cap = None
+        if limit and instrument:
+            cap = (limit + 1) * (bucket_ns // _NS_PER_MINUTE)
+            params.append(cap)
+        with self._reader() as conn:
+            rows = conn.execute(
+                _tick_bars_sql(active, bool(cap), descending), params
+            ).fetchall()
+        buckets: dict[tuple[str, int], list] = {}
+        for row_instrument, minute, open_, high, low, close, volume in rows:
+            key = (row_instrument, minute - minute % bucket_ns)
+            bar = buckets.get(key)
+            if bar is None:
+                buckets[key] = [minute, open_, high, low, minute, close, volume]
+                continue
+            if minute < bar[0]:
+                bar[0], bar[1] = minute, open_
+            if minute > bar[4]:
+                bar[4], bar[5] = minute, close
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[6] += volume
+        if cap and len(rows) == cap:
+            buckets.popitem()
+        bars = [
+            BarData(
+                time=ns_to_datetime(bucket),
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                volume=volume,
+                instrument=row_instrument,
+                timeframe=timeframe,
+            )
+            for (row_instrument, bucket), (
+                _, open_, high, low, _, close, volume
+            ) in islice(buckets.items(), limit or None)
+        ]
+        if reverse:
+            bars.reverse()
+        return bars
 
     def _row_to_tick(self, row: tuple) -> TickData:
-        instrument, time_str, bid, ask, last, volume = row
+        instrument, time, bid, ask, last, volume = row
         return TickData(
-            time=datetime.fromisoformat(time_str),
+            time=time,
             bid=bid,
             ask=ask,
             last=last,
@@ -226,7 +793,7 @@ class SQLiteStorageBackend(StorageBackend):
         (
             instrument,
             timeframe,
-            time_str,
+            time,
             open_,
             high,
             low,
@@ -234,7 +801,7 @@ class SQLiteStorageBackend(StorageBackend):
             volume,
         ) = row
         return BarData(
-            time=datetime.fromisoformat(time_str),
+            time=time,
             open=open_,
             high=high,
             low=low,
@@ -245,29 +812,358 @@ class SQLiteStorageBackend(StorageBackend):
         )
 
 
+_COLUMNS = {"ticks": _TICK_COLUMNS, "bars": _BAR_COLUMNS}
+
+# Predicados admitidos por ``fetch_*``, en el orden en que aparecen en el WHERE
+# y en el que se pasan sus parametros.
+_FILTERS = (
+    ("instrument", "instrument = ?"),
+    ("timeframe", "timeframe = ?"),
+    ("start", "time >= ?"),
+    ("end", "time <= ?"),
+)
+
+
+# Filtros de ``fetch_tick_bars`` sobre ``tick_bars_1m``.
+_TICK_BARS_FILTERS = (
+    ("instrument", "instrument = ?"),
+    ("start", "minute >= ?"),
+    ("end", "minute <= ?"),
+)
+
+
+@functools.lru_cache(maxsize=16)
+def _tick_bars_sql(active: frozenset[str], has_limit: bool, descending: bool) -> str:
+    query = (
+        "SELECT instrument, minute, open, high, low, close, volume FROM tick_bars_1m"
+    )
+    clauses = [clause for name, clause in _TICK_BARS_FILTERS if name in active]
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY minute DESC" if descending else " ORDER BY minute"
+    if has_limit:
+        query += " LIMIT ?"
+    return query
+
+
+def _timeframe_minutes(timeframe: str) -> int:
+    minutes, remainder = divmod(_timeframe_to_timedelta(timeframe), timedelta(minutes=1))
+    if remainder or not minutes:
+        raise ValueError(f"El timeframe {timeframe} no es un multiplo de 1 minuto")
+    return minutes
+
+
+def _time_filters(start: datetime | None, end: datetime | None) -> dict[str, object]:
+    return {
+        "start": None if start is None else datetime_to_ns(start),
+        "end": None if end is None else datetime_to_ns(end),
+    }
+
+
+def _resolve_order(order: Order | None, limit: int | None) -> tuple[bool, bool]:
+    """Devuelve ``(descending, reverse)`` para la consulta.
+
+    Una consulta con ``limit`` y sin ``order`` pide la cola: se resuelve con
+    ``ORDER BY time DESC LIMIT ?`` recorriendo el indice desde el final, y las
+    filas se invierten despues para devolverlas en orden cronologico.
+    """
+    if order is None:
+        return bool(limit), bool(limit)
+    if order in ("asc", "desc"):
+        return order == "desc", False
+    raise ValueError(f"order debe ser 'asc' o 'desc', no {order!r}")
+
+
+def _filter_query(
+    table: str,
+    filters: dict[str, object],
+    limit: int | None,
+    order: Order | None = None,
+    raw_time: bool = False,
+) -> tuple[str, list[object], bool]:
+    """Devuelve el SELECT cacheado, sus parametros y si hay que invertir las filas.
+
+    Ver :func:`_resolve_order` para el tratamiento de ``order`` y ``limit``.
+    """
+    descending, reverse = _resolve_order(order, limit)
+    active = frozenset(name for name, value in filters.items() if value is not None)
+    params = [filters[name] for name, _ in _FILTERS if name in active]
+    if limit:
+        params.append(limit)
+    query = _select_sql(table, active, bool(limit), descending, raw_time)
+    return query, params, reverse
+
+
+@functools.lru_cache(maxsize=64)
+def _select_sql(
+    table: str,
+    active: frozenset[str],
+    has_limit: bool,
+    descending: bool = False,
+    raw_time: bool = False,
+) -> str:
+    """Construye (una vez por conjunto de filtros activos) el SELECT de ``fetch_*``.
+
+    Con ``raw_time`` la columna ``time`` se devuelve como entero, sin pasar por
+    el conversor a ``datetime``.
+    """
+    columns = _COLUMNS[table] if raw_time else _with_time_alias(_COLUMNS[table])
+    query = f"SELECT {columns} FROM {table}"
+    clauses = [clause for name, clause in _FILTERS if name in active]
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY time DESC" if descending else " ORDER BY time"
+    if has_limit:
+        query += " LIMIT ?"
+    return query
+
+
+def _with_time_alias(columns: str) -> str:
+    """Sustituye ``time`` por su alias con conversor a ``datetime``."""
+    return ", ".join(
+        _SELECT_TIME if name == "time" else name for name in columns.split(", ")
+    )
+
+
+def _tick_columns(rows: Sequence[tuple]) -> Dict[str, np.ndarray]:
+    """Transpone filas ``(instrument, time_ns, bid, ask, last, volume)``.
+
+    ``time`` se devuelve como ``datetime64[ns]``, los precios ausentes como
+    ``NaN`` y el volumen ausente como ``MISSING_VOLUME``.
+    """
+    if rows:
+        instruments, times, bids, asks, lasts, volumes = zip(*rows)
+    else:
+        instruments = times = bids = asks = lasts = volumes = ()
+    return {
+        "time": np.array(times, dtype=np.int64).view("datetime64[ns]"),
+        "bid": np.array(bids, dtype=np.float64),
+        "ask": np.array(asks, dtype=np.float64),
+        "last": np.array(lasts, dtype=np.float64),
+        "volume": np.array(
+            [MISSING_VOLUME if volume is None else volume for volume in volumes],
+            dtype=np.int64,
+        ),
+        "instrument": np.array(instruments, dtype=object),
+    }
+
+
+def _bar_frame(rows: Sequence[tuple]) -> pd.DataFrame:
+    """``DataFrame`` de barras a partir de filas con ``time`` en nanosegundos."""
+    frame = pd.DataFrame.from_records(rows, columns=_BAR_COLUMNS.split(", "))
+    frame["time"] = pd.to_datetime(frame["time"], unit="ns")
+    return frame
+
+
+def _iso_to_ns(value: str | None) -> int | None:
+    return None if value is None else datetime_to_ns(datetime.fromisoformat(value))
+
+
+def _column_type(conn: sqlite3.Connection, table: str, column: str) -> str | None:
+    for row in conn.execute(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return row[2].upper()
+    return None
+
+
+def _tick_batch_rows(batch: TickBatch) -> list[tuple]:
+    """Parametros de ``_INSERT_TICK_SQL`` leidos de las columnas de ``batch``."""
+    data = batch.array
+    return list(
+        zip(
+            _interned_names(data["instr"], instrument_table),
+            data["time"].tolist(),
+            _nullable(data["bid"], np.isnan(data["bid"])),
+            _nullable(data["ask"], np.isnan(data["ask"])),
+            _nullable(data["last"], np.isnan(data["last"])),
+            _nullable(data["volume"], data["volume"] == MISSING_VOLUME),
+        )
+    )
+
+
+def _bar_batch_rows(batch: BarBatch) -> list[tuple]:
+    """Parametros de ``_INSERT_BAR_SQL`` leidos de las columnas de ``batch``."""
+    data = batch.array
+    return list(
+        zip(
+            _interned_names(data["instr"], instrument_table),
+            _interned_names(data["timeframe"], timeframe_table),
+            data["time"].tolist(),
+            data["open"].tolist(),
+            data["high"].tolist(),
+            data["low"].tolist(),
+            data["close"].tolist(),
+            data["volume"].tolist(),
+        )
+    )
+
+
+def _interned_names(ids: np.ndarray, table: InternTable) -> list[str]:
+    """Traduce identificadores internados resolviendo cada uno una sola vez."""
+    unique, inverse = np.unique(ids, return_inverse=True)
+    names = [table.name(identifier) for identifier in unique.tolist()]
+    return [names[index] for index in inverse.tolist()]
+
+
+def _nullable(values: np.ndarray, missing: np.ndarray) -> list:
+    column = values.astype(object)
+    column[missing] = None
+    return column.tolist()
+
+
+def _is_busy_error(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def _uses_autoincrement(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None and "AUTOINCREMENT" in row[0].upper()
+
+
+def _rebuild_table(
+    conn: sqlite3.Connection,
+    table: str,
+    create_sql: str,
+    columns: str,
+    select: str,
+) -> None:
+    """Recrea ``table`` con ``create_sql`` copiando las filas con ``select``.
+
+    Los indices y triggers de la tabla antigua desaparecen con ella;
+    ``_initialize`` los vuelve a crear sobre la nueva.
+    """
+    legacy = f"{table}_legacy"
+    conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    conn.execute(create_sql)
+    conn.execute(f"INSERT INTO {table} ({columns}) SELECT {select} FROM {legacy}")
+    conn.execute(f"DROP TABLE {legacy}")
+
+
+def _close_backend(ref: weakref.ref[SQLiteStorageBackend]) -> None:
+    backend = ref()
+    if backend is not None:
+        backend.close()
+
+
+def _close_service(ref: weakref.ref[StorageService], writer: threading.Thread) -> None:
+    service = ref()
+    if service is not None:
+        service.close()
+    else:
+        # Servicio liberado sin cerrar: su hilo vacia la cola y termina solo.
+        writer.join()
+
+
 class StorageService:
-    """Fachada sencilla sobre el backend de almacenamiento."""
+    """Fachada sencilla sobre el backend de almacenamiento.
+
+    Las escrituras se encolan y las ejecuta un unico hilo escritor, de modo que
+    quien produce ticks nunca espera al disco. Los lotes consecutivos del mismo
+    tipo se agrupan en una sola llamada al backend. Las lecturas vacian antes la
+    cola para ver siempre lo ya guardado; ``flush`` y ``close`` permiten
+    sincronizarse explicitamente. Al salir del proceso se llama a ``close``
+    automaticamente, antes de que se cierre el backend, para no perder lo encolado.
+    Tambien puede usarse con ``with``, que llama a ``close`` al salir del bloque.
+    Tras ``close``, ``save_ticks``/``save_bars`` lanzan ``RuntimeError`` y
+    ``submit_ticks``/``submit_bars`` devuelven un futuro con esa excepcion.
+
+    El hilo escritor acumula filas hasta ``batch_size`` o hasta ``max_latency``
+    segundos desde el primer lote pendiente, lo que ocurra antes, y las guarda en
+    una sola transaccion. La cola admite como mucho ``max_pending`` lotes; al
+    llenarse, quien escribe espera (contrapresion) en lugar de crecer sin limite.
+
+    ``submit_ticks``/``submit_bars`` devuelven un ``concurrent.futures.Future``
+    con el numero de filas guardadas (o la excepcion del backend). Desde asyncio
+    se espera con ``await asyncio.wrap_future(future)`` sin bloquear el bucle.
+    Un futuro cancelado antes de que el hilo escritor tome su lote (tambien al
+    cancelarse la tarea que lo espera con ``wrap_future``) descarta ese lote.
+    """
 
     def __init__(
         self,
         backend: StorageBackend | None = None,
         db_path: str | Path | None = None,
+        batch_size: int = 1000,
+        max_latency: float = 0.1,
+        max_pending: int = 10_000,
     ) -> None:
+        self._owns_backend = backend is None
         if backend is not None:
             self._backend = backend
         else:
             final_path = db_path or (Path("data") / "market_data.db")
             self._backend = SQLiteStorageBackend(final_path)
+        self._batch_size = batch_size
+        self._max_latency = max_latency
+        self._queue: queue.Queue[tuple[str, tuple, Future | None]] = queue.Queue(
+            maxsize=max_pending
+        )
+        self._closed = False
+        self._state_lock = threading.Lock()
+        # El hilo solo guarda una referencia debil al servicio: si nadie lo cierra,
+        # el recolector puede liberarlo y el hilo termina al quedar la cola vacia.
+        self._writer = threading.Thread(
+            target=_drain,
+            args=(
+                self._queue, self._backend, weakref.ref(self), batch_size, max_latency
+            ),
+            name="nt-data-storage-writer",
+            daemon=True,
+        )
+        self._writer.start()
+        # atexit ejecuta en orden inverso: este cierre va antes que el del backend.
+        atexit.register(_close_service, weakref.ref(self), self._writer)
 
     def save_ticks(self, ticks: Sequence[TickData]) -> int:
-        count = self._backend.save_ticks(ticks)
-        logger.info("%s ticks guardados en la base de datos", count)
-        return count
+        self._submit("ticks", ticks)
+        return len(ticks)
 
     def save_bars(self, bars: Sequence[BarData]) -> int:
-        count = self._backend.save_bars(bars)
-        logger.info("%s barras guardadas en la base de datos", count)
-        return count
+        self._submit("bars", bars)
+        return len(bars)
+
+    def submit_ticks(self, ticks: Sequence[TickData]) -> Future[int]:
+        """Encola ``ticks`` y devuelve un futuro que se resuelve al guardarlos."""
+        future: Future[int] = Future()
+        self._submit("ticks", ticks, future)
+        return future
+
+    def submit_bars(self, bars: Sequence[BarData]) -> Future[int]:
+        """Encola ``bars`` y devuelve un futuro que se resuelve al guardarlas."""
+        future: Future[int] = Future()
+        self._submit("bars", bars, future)
+        return future
+
+    def flush(self) -> None:
+        """Bloquea hasta que todas las escrituras encoladas esten en el backend."""
+        done: Future[None] = Future()
+        with self._state_lock:
+            if self._closed:
+                return
+            self._queue.put(("flush", (), done))
+        done.result()
+
+    def close(self) -> None:
+        """Vacia la cola, detiene el hilo escritor y cierra el backend propio."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            done: Future[None] = Future()
+            self._queue.put(("close", (), done))
+        done.result()
+        self._writer.join()
+        if self._owns_backend:
+            self._backend.close()
+
+    def __enter__(self) -> StorageService:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
     def get_ticks(
         self,
@@ -275,8 +1171,61 @@ class StorageService:
         start: datetime | None = None,
         end: datetime | None = None,
         limit: int | None = None,
+        order: Order | None = None,
     ) -> List[TickData]:
-        return self._backend.fetch_ticks(instrument, start, end, limit)
+        self.flush()
+        return self._backend.fetch_ticks(instrument, start, end, limit, order)
+
+    def iter_ticks(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[TickData]:
+        """Como ``get_ticks`` pero entregando los ticks a medida que se leen."""
+        self.flush()
+        return self._backend.fetch_ticks_iter(instrument, start, end, limit, order)
+
+    def get_ticks_soa(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Dict[str, np.ndarray]:
+        """Como ``get_ticks`` pero en columnas NumPy, para analisis vectorizado."""
+        self.flush()
+        return self._backend.fetch_ticks_soa(instrument, start, end, limit, order)
+
+    def get_tick_bars(
+        self,
+        instrument: str | None = None,
+        timeframe: str = "1m",
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> List[BarData]:
+        """Barras calculadas desde los ticks guardados (ver ``fetch_tick_bars``)."""
+        self.flush()
+        return self._backend.fetch_tick_bars(
+            instrument, timeframe, start, end, limit, order
+        )
+
+    def get_ticks_df(
+        self,
+        instrument: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> pd.DataFrame:
+        """Como ``get_ticks`` pero en un ``pandas.DataFrame``."""
+        self.flush()
+        return self._backend.fetch_ticks_df(instrument, start, end, limit, order)
 
     def get_bars(
         self,
@@ -285,8 +1234,176 @@ class StorageService:
         start: datetime | None = None,
         end: datetime | None = None,
         limit: int | None = None,
+        order: Order | None = None,
     ) -> List[BarData]:
-        return self._backend.fetch_bars(instrument, timeframe, start, end, limit)
+        self.flush()
+        return self._backend.fetch_bars(instrument, timeframe, start, end, limit, order)
+
+    def iter_bars(
+        self,
+        instrument: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> Iterator[BarData]:
+        """Como ``get_bars`` pero entregando las barras a medida que se leen."""
+        self.flush()
+        return self._backend.fetch_bars_iter(
+            instrument, timeframe, start, end, limit, order
+        )
+
+    def get_bars_df(
+        self,
+        instrument: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+        order: Order | None = None,
+    ) -> pd.DataFrame:
+        """Como ``get_bars`` pero en un ``pandas.DataFrame``."""
+        self.flush()
+        return self._backend.fetch_bars_df(
+            instrument, timeframe, start, end, limit, order
+        )
+
+    def _submit(
+        self,
+        kind: str,
+        items: Sequence[TickData] | Sequence[BarData],
+        future: Future | None = None,
+    ) -> None:
+        if not items:
+            if future is not None:
+                future.set_result(0)
+            return
+        # Los lotes columnares se copian (quien produce puede reutilizar el suyo)
+        # en lugar de convertirse en una tupla de objetos.
+        payload = items.copy() if isinstance(items, _BATCH_TYPES) else tuple(items)
+        with self._state_lock:
+            if not self._closed:
+                self._queue.put((kind, payload, future))
+                return
+        # El backend puede estar ya cerrado: nunca se informa de filas no guardadas.
+        error = RuntimeError(f"StorageService cerrado: descartados {len(items)} {kind}")
+        if future is None:
+            raise error
+        future.set_exception(error)
+
+
+def _accept(
+    payload: tuple,
+    future: Future | None,
+    rows: list,
+    waiters: list[tuple[Future, int]],
+) -> None:
+    """Suma un lote al grupo en curso salvo que su futuro ya este cancelado."""
+    if _claim(future, len(payload), waiters):
+        rows.extend(payload)
+
+
+def _claim(
+    future: Future | None, size: int, waiters: list[tuple[Future, int]]
+) -> bool:
+    """Registra el futuro de un lote; ``False`` si se cancelo antes de tomarlo."""
+    if future is None:
+        return True
+    # A partir de aqui ``cancel()`` ya no tiene efecto sobre el futuro.
+    if not future.set_running_or_notify_cancel():
+        return False
+    waiters.append((future, size))
+    return True
+
+
+def _resolve(
+    future: Future, result: object = None, exception: BaseException | None = None
+) -> None:
+    """Entrega el resultado sin dejar que un futuro ya resuelto tumbe al escritor."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        logger.debug("Futuro de escritura ya resuelto o cancelado: %s", future)
+
+
+def _drain(
+    work_queue: queue.Queue[tuple[str, tuple, Future | None]],
+    backend: StorageBackend,
+    service_ref: weakref.ref[StorageService],
+    batch_size: int,
+    max_latency: float,
+) -> None:
+    """Bucle del hilo escritor de un ``StorageService``.
+
+    Termina con el mensaje ``close`` o cuando el servicio ya fue liberado sin
+    cerrarse y no queda nada en la cola.
+    """
+    pending: tuple[str, tuple, Future | None] | None = None
+    while True:
+        if pending is None:
+            try:
+                pending = work_queue.get(timeout=_IDLE_POLL)
+            except queue.Empty:
+                if service_ref() is None:
+                    return
+                continue
+        kind, payload, future = pending
+        pending = None
+        if kind not in {"ticks", "bars"}:
+            _resolve(future, None)
+            if kind == "close":
+                return
+            continue
+        if isinstance(payload, _BATCH_TYPES):
+            # Los lotes columnares ya llegan agrupados: se guardan tal cual
+            # para que el backend use su camino por columnas.
+            batch_waiters: list[tuple[Future, int]] = []
+            if _claim(future, len(payload), batch_waiters):
+                _write(backend, kind, payload, batch_waiters)
+            continue
+        rows: list = []
+        waiters: list[tuple[Future, int]] = []
+        _accept(payload, future, rows, waiters)
+        deadline = time.monotonic() + max_latency
+        while len(rows) < batch_size:
+            try:
+                pending = work_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            # Un lote de otro tipo, columnar, flush o close cierra el grupo.
+            if pending[0] != kind or isinstance(pending[1], _BATCH_TYPES):
+                break
+            _accept(pending[1], pending[2], rows, waiters)
+            pending = None
+        if rows:
+            _write(backend, kind, rows, waiters)
+
+
+def _write(
+    backend: StorageBackend,
+    kind: str,
+    rows: list | TickBatch | BarBatch,
+    waiters: list[tuple[Future, int]],
+) -> None:
+    """Guarda ``rows`` y resuelve los futuros de los lotes agrupados en ellas."""
+    try:
+        if kind == "ticks":
+            count = backend.save_ticks(rows)
+            logger.info("%s ticks guardados en la base de datos", count)
+        else:
+            count = backend.save_bars(rows)
+            logger.info("%s barras guardadas en la base de datos", count)
+    except Exception as exc:
+        logger.exception("Error guardando %s %s: %s", len(rows), kind, exc)
+        for future, _ in waiters:
+            _resolve(future, exception=exc)
+        return
+    for future, size in waiters:
+        _resolve(future, size)
 
 
 __all__ = [
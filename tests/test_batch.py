@@ -0,0 +1,47 @@
+﻿from datetime import datetime
+
+from nt_data.models import BarBatch, BarData, TickBatch, TickData
+
+
+def test_tick_batch_round_trips_ticks():
+    ticks = [
+        TickData(
+            time=datetime(2024, 1, 2, 15, 30, 0, 123456),
+            bid=1.0,
+            ask=1.5,
+            last=1.25,
+            volume=10,
+            instrument="ES",
+        ),
+        TickData(
+            time=datetime(2024, 1, 2, 15, 30, 1),
+            bid=None,
+            ask=None,
+            last=1.5,
+            volume=None,
+            instrument="NQ",
+        ),
+    ]
+    batch = TickBatch(capacity=1)
+    for tick in ticks:
+        batch.append(tick)
+    assert len(batch) == 2
+    assert batch.array["last"].tolist() == [1.25, 1.5]
+    assert batch.to_ticks() == ticks
+    assert TickBatch.from_ticks(ticks)[1] == ticks[1]
+
+
+def test_bar_batch_round_trips_bars():
+    bars = [
+        BarData(
+            time=datetime(2024, 1, 2),
+            open=1.0,
+            high=2.0,
+            low=0.5,
+            close=1.5,
+            volume=100,
+            instrument="ES",
+            timeframe="1D",
+        )
+    ]
+    assert BarBatch.from_bars(bars).to_bars() == bars
@@ -0,0 +1,13 @@
+﻿from nt_data.config import Settings, load_settings
+
+
+def test_settings_follow_reloaded_environment(monkeypatch):
+    monkeypatch.setenv("NT_INSTRUMENT", "NQ")
+    load_settings.cache_clear()
+    try:
+        assert Settings() is load_settings()
+        assert Settings().instrument == "NQ"
+    finally:
+        monkeypatch.undo()
+        load_settings.cache_clear()
+    assert Settings().instrument != "NQ"
@@ -0,0 +1,78 @@
+﻿from datetime import datetime, timedelta
+
+from nt_data.models import TickData
+from nt_data.services import CompressedTickStorageBackend, SQLiteStorageBackend
+from nt_data.services.gorilla import decode_floats, decode_ints, encode_floats, encode_ints
+
+
+def test_gorilla_codecs_round_trip():
+    times = [1_704_205_800_000_000_000 + step * 1_000_000 for step in range(100)]
+    times[40] += 123
+    times[70] -= 5_000_000_000
+    prices = [4500.25, 4500.25, None, 4500.5, -0.0, 1e-300, 4499.75] * 10
+    volumes = [1, 3, -1, 10, 10, 2] * 5
+
+    assert decode_ints(encode_ints(times), len(times)) == times
+    assert decode_ints(encode_ints(volumes, order=1), len(volumes), order=1) == volumes
+    assert decode_floats(encode_floats(prices), len(prices)) == prices
+    assert len(encode_floats([4500.25] * 1000)) < 200
+
+
+def test_compressed_backend_fetches_ticks_across_blocks(tmp_path):
+    base = datetime(2024, 1, 1, 23, 59, 58)
+    ticks = [
+        TickData(
+            time=base + timedelta(seconds=index),
+            bid=None if index == 2 else 4500.0 + index,
+            ask=4500.5 + index,
+            last=4500.25 + index,
+            volume=None if index == 3 else index,
+            instrument="ES 12-25",
+        )
+        for index in range(5)
+    ]
+    backend = CompressedTickStorageBackend(tmp_path / "market.db")
+    backend.save_ticks(ticks[3:])
+    backend.save_ticks(ticks[:3])
+
+    assert backend.fetch_ticks("ES 12-25") == ticks
+    assert backend.fetch_ticks("ES 12-25", limit=2) == ticks[3:]
+    assert backend.fetch_ticks(start=ticks[1].time, end=ticks[2].time) == ticks[1:3]
+    assert backend.fetch_ticks_soa(limit=1)["volume"].tolist() == [4]
+    bars = backend.fetch_tick_bars("ES 12-25", "1m")
+    assert [(bar.open, bar.close, bar.volume) for bar in bars] == [
+        (4500.25, 4501.25, 1),
+        (4502.25, 4504.25, 6),
+    ]
+    backend.close()
+
+
+def test_small_batches_are_merged_into_the_day_block(tmp_path):
+    base = datetime(2024, 1, 2, 14, 30)
+    ticks = [
+        TickData(
+            time=base + timedelta(milliseconds=250 * index),
+            bid=4500.0 + index % 8 * 0.25,
+            ask=4500.25 + index % 8 * 0.25,
+            last=4500.0 + index % 8 * 0.25,
+            volume=1 + index % 3,
+            instrument="ES 12-25",
+        )
+        for index in range(500)
+    ]
+    sizes = {}
+    for backend_type in (SQLiteStorageBackend, CompressedTickStorageBackend):
+        path = tmp_path / f"{backend_type.__name__}.db"
+        backend = backend_type(path)
+        for tick in ticks:
+            backend.save_ticks([tick])
+        assert backend.fetch_ticks() == ticks
+        if backend_type is CompressedTickStorageBackend:
+            with backend._reader() as conn:
+                query = "SELECT count FROM tick_blocks ORDER BY id"
+                counts = conn.execute(query).fetchall()
+            assert counts == [(256,), (244,)]
+        backend.close()
+        sizes[backend_type] = path.stat().st_size
+
+    assert sizes[CompressedTickStorageBackend] < sizes[SQLiteStorageBackend]
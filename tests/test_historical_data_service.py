@@ -15,4 +15,57 @@ def test_historical_service_returns_bars():
         end=now,
     )
     assert bars, "Se esperaban barras simuladas"
-    assert bars[0].instrument == "ES 12-25"
\ No newline at end of file
+    assert bars[0].instrument == "ES 12-25"
+
+
+class _CountingClient(SimulatedNinjaTraderClient):
+    def __init__(self, empty: bool = False) -> None:
+        super().__init__()
+        self.calls = 0
+        self._empty = empty
+
+    def request_historical_data(self, instrument, timeframe, start, end):
+        self.calls += 1
+        if self._empty:
+            return []
+        return super().request_historical_data(instrument, timeframe, start, end)
+
+
+def test_historical_service_caches_repeated_queries():
+    now = datetime.utcnow()
+    query = dict(
+        instrument="ES 12-25",
+        timeframe="5m",
+        start=now - timedelta(hours=1),
+        end=now,
+    )
+
+    client = _CountingClient()
+    service = HistoricalDataService(client)
+    first = service.get_historical_bars(**query)
+    assert service.get_historical_bars(**query) == first
+    assert client.calls == 1
+
+    first[0].close = -1.0
+    assert service.get_historical_bars(**query)[0].close != -1.0
+
+    empty_client = _CountingClient(empty=True)
+    empty_service = HistoricalDataService(empty_client, empty_ttl=60.0)
+    assert empty_service.get_historical_bars(**query) == []
+    assert empty_service.get_historical_bars(**query) == []
+    assert empty_client.calls == 1
+
+
+def test_empty_range_returns_empty_columns():
+    client = SimulatedNinjaTraderClient()
+    client.connect()
+    now = datetime.utcnow()
+    columns = client.request_historical_bars_columnar("ES 12-25", "5m", now, now)
+    assert [len(column) for column in columns] == [0] * 6
+
+
+def test_empty_range_returns_no_bars():
+    client = SimulatedNinjaTraderClient()
+    client.connect()
+    now = datetime.utcnow()
+    assert client.request_historical_data("ES 12-25", "5m", now, now) == []
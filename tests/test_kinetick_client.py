@@ -0,0 +1,150 @@
+﻿import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from nt_data.connectors import KinetickEODClient
+
+
+def test_parse_export_reads_daily_bars(tmp_path):
+    export_path = tmp_path / "export.csv"
+    export_path.write_text(
+        "date,open,high,low,close,volume\n"
+        "2024-01-02,1.0,2.0,0.5,1.5,100\n"
+        ",1.0,1.0,1.0,1.0,1\n"
+        "2024-01-03,1.1,,0.9,1.0,12.0\n",
+        encoding="utf-8",
+    )
+    client = KinetickEODClient(tmp_path / "commands", tmp_path / "exports")
+    bars = client._parse_export(export_path, "ES")
+    assert [bar.time for bar in bars] == [datetime(2024, 1, 2), datetime(2024, 1, 3)]
+    assert bars[0].close == 1.5 and bars[0].timeframe == "1D"
+    assert bars[1].high == 0.0 and bars[1].volume == 12
+    assert type(bars[1].open) is float and type(bars[1].volume) is int
+
+
+class _SilentWatcher:
+    """Watcher que nunca entrega eventos, como inotify sobre CIFS/NFS."""
+
+    def __init__(self) -> None:
+        self.timeouts = []
+
+    def read(self, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(timeout / 1000)
+        return []
+
+
+def test_wait_for_export_polls_when_the_watcher_stays_silent(tmp_path):
+    client = KinetickEODClient(
+        tmp_path / "commands", tmp_path / "exports", export_timeout=5, poll_interval=0.01
+    )
+    client.connect()
+    export_path = tmp_path / "exports" / "remote.csv"
+    writer = threading.Timer(
+        0.05,
+        export_path.write_text,
+        ("date,open,high,low,close,volume\n2024-01-02,1,2,0.5,1.5,100\n",),
+    )
+    watcher = _SilentWatcher()
+    started = time.monotonic()
+    writer.start()
+    bars = client._wait_for_export(export_path, "ES", watcher)
+
+    assert time.monotonic() - started < 2
+    assert [bar.close for bar in bars] == [1.5]
+    assert watcher.timeouts and max(watcher.timeouts) <= 10
+    assert not export_path.exists()
+
+
+_EXPORT_CSV = "date,open,high,low,close,volume\n2024-01-02,1,2,0.5,1.5,100\n"
+_needs_fifo = pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="requiere mkfifo")
+
+
+def _answer(payload):
+    """Responde como el AddOn: escribe el CSV en la ruta que indica el comando."""
+    Path(payload.strip().split(";")[-1]).write_text(_EXPORT_CSV, encoding="utf-8")
+
+
+def _fifo_client(tmp_path):
+    client = KinetickEODClient(
+        tmp_path / "commands",
+        tmp_path / "exports",
+        export_timeout=5,
+        poll_interval=0.01,
+        use_command_fifo=True,
+    )
+    client.connect()
+    return client
+
+
+def _request(client):
+    return client.request_historical_data(
+        "ES", "1D", datetime(2024, 1, 2), datetime(2024, 1, 3)
+    )
+
+
+def _serve_command_files(commands_dir, stop):
+    while not stop.is_set():
+        for path in commands_dir.glob("cmd_*.txt"):
+            _answer(path.read_text(encoding="utf-8"))
+            path.unlink()
+        time.sleep(0.01)
+
+
+@_needs_fifo
+def test_commands_go_through_the_fifo_when_the_addon_reads_it(tmp_path):
+    client = _fifo_client(tmp_path)
+    fd = os.open(tmp_path / "commands" / "commands.fifo", os.O_RDONLY | os.O_NONBLOCK)
+    lines = []
+
+    def serve():
+        buffer = b""
+        deadline = time.monotonic() + 5
+        while b"\n" not in buffer and time.monotonic() < deadline:
+            try:
+                buffer += os.read(fd, 4096)
+            except BlockingIOError:
+                pass
+            time.sleep(0.01)
+        lines.append(buffer.decode("utf-8"))
+        _answer(lines[0])
+
+    reader = threading.Thread(target=serve)
+    reader.start()
+    try:
+        bars = _request(client)
+    finally:
+        reader.join()
+        os.close(fd)
+        client.disconnect()
+
+    assert [bar.close for bar in bars] == [1.5]
+    assert lines[0].startswith("DOWNLOAD;ES;2024-01-02;2024-01-03;")
+    assert not list((tmp_path / "commands").glob("cmd_*.txt"))
+
+
+@_needs_fifo
+def test_commands_fall_back_to_files_without_a_fifo_reader(tmp_path):
+    client = _fifo_client(tmp_path)
+    commands_dir = tmp_path / "commands"
+    stop = threading.Event()
+    server = threading.Thread(target=_serve_command_files, args=(commands_dir, stop))
+    server.start()
+    try:
+        # Sin lector la apertura falla con ENXIO.
+        assert [bar.close for bar in _request(client)] == [1.5]
+        # Con un lector que desaparece, la escritura falla con EPIPE.
+        fd = os.open(commands_dir / "commands.fifo", os.O_RDONLY | os.O_NONBLOCK)
+        assert client._send_command_fifo("PING")
+        os.close(fd)
+        assert [bar.close for bar in _request(client)] == [1.5]
+        assert client._fifo_fd is None
+    finally:
+        stop.set()
+        server.join()
+        client.disconnect()
+
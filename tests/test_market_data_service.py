@@ -19,4 +19,29 @@ def test_subscribe_realtime_ticks_generates_data():
     assert event.wait(timeout=1), "No se recibieron ticks simulados"
     cancel()
     service.stop_all()
-    assert len(results) > 0
\ No newline at end of file
+    assert len(results) > 0
+
+
+def test_tick_pool_reuses_instances_in_rotation():
+    client = SimulatedNinjaTraderClient(tick_interval=0.001, tick_pool_size=2)
+    client.connect()
+    seen = []
+    done = threading.Event()
+
+    def on_tick(tick):
+        # El tick se reutiliza: se copian sus valores antes de la rotacion.
+        seen.append((id(tick), tick.last, tick.time, tick.instrument))
+        if len(seen) == 6:
+            done.set()
+
+    cancel = client.subscribe_market_data("ES 12-25", on_tick)
+    assert done.wait(timeout=2), "No se recibieron ticks simulados"
+    cancel()
+    client.disconnect()
+
+    ids = [identifier for identifier, _, _, _ in seen[:6]]
+    assert len(set(ids)) == 2
+    assert ids[0::2] == [ids[0]] * 3 and ids[1::2] == [ids[1]] * 3
+    lasts = [last for _, last, _, _ in seen[:6]]
+    assert len(set(lasts)) == 6
+    assert all(instrument == "ES 12-25" for _, _, _, instrument in seen)
@@ -0,0 +1,78 @@
+﻿from datetime import datetime, timedelta
+
+from nt_data.models import TickData
+from nt_data.services import ChunkRouter, PartitionedSQLiteStorageBackend
+
+
+def _tick(time, last, instrument="ES 12-25"):
+    return TickData(
+        time=time,
+        bid=last - 0.25,
+        ask=last + 0.25,
+        last=last,
+        volume=1,
+        instrument=instrument,
+    )
+
+
+def test_ticks_are_routed_to_chunks_and_queried_across_them(tmp_path):
+    backend = PartitionedSQLiteStorageBackend(
+        tmp_path / "market.db", router=ChunkRouter(period="day")
+    )
+    backend.save_ticks(
+        [
+            _tick(datetime(2024, 1, 1, 23, 59), 1.0),
+            _tick(datetime(2024, 1, 2, 9, 30), 2.0),
+            _tick(datetime(2024, 1, 3, 9, 30), 3.0),
+            _tick(datetime(2024, 1, 2, 10, 0), 9.0, instrument="NQ 12-25"),
+        ]
+    )
+
+    chunks = backend.tick_chunks(instrument="ES 12-25")
+    assert [chunk.name[-8:] for chunk in chunks] == ["20240101", "20240102", "20240103"]
+
+    ranged = backend.fetch_ticks(
+        "ES 12-25", start=datetime(2024, 1, 1, 12), end=datetime(2024, 1, 2, 12)
+    )
+    assert [tick.last for tick in ranged] == [1.0, 2.0]
+    assert [tick.last for tick in backend.fetch_ticks(limit=2)] == [9.0, 3.0]
+    assert [bar.close for bar in backend.fetch_tick_bars("ES 12-25", "1m")] == [
+        1.0,
+        2.0,
+        3.0,
+    ]
+
+    assert backend.drop_tick_chunks(before=datetime(2024, 1, 3)) == 3
+    assert [tick.last for tick in backend.fetch_ticks()] == [3.0]
+    backend.close()
+
+
+def test_queries_span_more_chunks_than_a_compound_select_allows(tmp_path):
+    backend = PartitionedSQLiteStorageBackend(
+        tmp_path / "market.db", router=ChunkRouter(period="day")
+    )
+    first = datetime(2024, 1, 1, 9, 30)
+    ticks = [_tick(first + timedelta(days=day), float(day)) for day in range(600)]
+    ticks += [
+        _tick(first + timedelta(days=day, hours=1), 1000.0 + day, instrument="NQ 12-25")
+        for day in range(0, 600, 100)
+    ]
+    backend.save_ticks(ticks)
+    assert len(backend.tick_chunks()) == 606
+
+    es_ticks = backend.fetch_ticks("ES 12-25")
+    assert [tick.last for tick in es_ticks] == [float(day) for day in range(600)]
+    every_tick = backend.fetch_ticks()
+    assert [tick.time for tick in every_tick] == sorted(tick.time for tick in ticks)
+    assert [tick.last for tick in backend.fetch_ticks(limit=3)] == [597.0, 598.0, 599.0]
+    assert [tick.last for tick in backend.fetch_ticks(limit=3, order="asc")] == [
+        0.0,
+        1000.0,
+        1.0,
+    ]
+    assert [tick.last for tick in backend.fetch_ticks(limit=2, order="desc")] == [
+        599.0,
+        598.0,
+    ]
+    assert len(backend.fetch_ticks_soa("ES 12-25")["last"]) == 600
+    backend.close()
@@ -1,7 +1,19 @@
-﻿from datetime import datetime
+﻿import asyncio
+import gc
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
 
-from nt_data.models import BarData, TickData
-from nt_data.services import StorageService
+import numpy as np
+import pytest
+
+from nt_data.models import BarBatch, BarData, TickBatch, TickData
+from nt_data.services import SQLiteStorageBackend, StorageBackend, StorageService
 
 
 def test_storage_service_persists_and_fetches(tmp_path):
@@ -33,4 +45,462 @@ def test_storage_service_persists_and_fetches(tmp_path):
     fetched_ticks = service.get_ticks(instrument="ES")
     fetched_bars = service.get_bars(instrument="ES")
     assert fetched_ticks and fetched_ticks[0].last == 1.25
-    assert fetched_bars and fetched_bars[0].close == 1.5
\ No newline at end of file
+    assert fetched_bars and fetched_bars[0].close == 1.5
+
+
+def test_storage_service_close_flushes_queued_writes(tmp_path):
+    ticks = [
+        TickData(
+            time=datetime(2024, 1, 2, 15, 30, second),
+            bid=1.0,
+            ask=1.5,
+            last=1.25,
+            volume=1,
+            instrument="ES",
+        )
+        for second in range(50)
+    ]
+    service = StorageService(db_path=tmp_path / "market.db")
+    for tick in ticks:
+        assert service.save_ticks([tick]) == 1
+    service.close()
+    reopened = StorageService(db_path=tmp_path / "market.db")
+    assert len(reopened.get_ticks(instrument="ES")) == 50
+
+
+def test_queued_writes_are_flushed_at_interpreter_exit(tmp_path):
+    db_path = tmp_path / "market.db"
+    script = f"""
+from datetime import datetime
+from nt_data.models import BarData
+from nt_data.services import StorageService
+
+bar = BarData(datetime(2024, 1, 2), 1.0, 2.0, 0.5, 1.5, 100, "ES", "1D")
+StorageService(db_path={str(db_path)!r}, max_latency=5.0).save_bars([bar] * 50)
+"""
+    subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    service = StorageService(db_path=db_path)
+    assert len(service.get_bars(instrument="ES")) == 50
+    service.close()
+
+
+def test_unclosed_service_is_released_with_its_writer(tmp_path):
+    backend = SQLiteStorageBackend(tmp_path / "market.db")
+    service = StorageService(backend=backend)
+    service.save_ticks([TickData(datetime(2024, 1, 2), 1.0, 1.5, 1.25, 3, "ES")])
+    writer = service._writer
+    ref = weakref.ref(service)
+    del service
+    gc.collect()
+    assert ref() is None
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+    assert len(backend.fetch_ticks(instrument="ES")) == 1
+
+
+def test_service_closes_on_leaving_with_block(tmp_path):
+    with StorageService(db_path=tmp_path / "market.db") as service:
+        service.save_ticks([TickData(datetime(2024, 1, 2), 1.0, 1.5, 1.25, 3, "ES")])
+    assert not service._writer.is_alive()
+    with StorageService(db_path=tmp_path / "market.db") as reopened:
+        assert len(reopened.get_ticks(instrument="ES")) == 1
+
+
+def test_writes_after_close_are_rejected(tmp_path):
+    tick = TickData(datetime(2024, 1, 2), 1.0, 1.5, 1.25, 3, "ES")
+    bar = BarData(datetime(2024, 1, 2), 1.0, 2.0, 0.5, 1.5, 100, "ES", "1D")
+    service = StorageService(db_path=tmp_path / "market.db")
+    service.close()
+    with pytest.raises(RuntimeError):
+        service.save_ticks([tick])
+    with pytest.raises(RuntimeError):
+        service.save_bars([bar])
+    with pytest.raises(RuntimeError):
+        service.submit_ticks([tick]).result(timeout=5)
+    with StorageService(db_path=tmp_path / "market.db") as reopened:
+        assert reopened.get_ticks(instrument="ES") == []
+        assert reopened.get_bars(instrument="ES") == []
+
+
+def test_legacy_text_times_are_migrated_to_integers(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE ticks (id INTEGER PRIMARY KEY AUTOINCREMENT, instrument TEXT"
+        " NOT NULL, time TEXT NOT NULL, bid REAL, ask REAL, last REAL, volume INTEGER)"
+    )
+    conn.execute(
+        "INSERT INTO ticks (instrument, time, bid, ask, last, volume)"
+        " VALUES ('ES', '2024-01-02T15:30:00.250000', 1.0, 1.5, 1.25, 3)"
+    )
+    conn.commit()
+    conn.close()
+
+    service = StorageService(db_path=db_path)
+    fetched = service.get_ticks(instrument="ES", start=datetime(2024, 1, 2))
+    assert [tick.time for tick in fetched] == [datetime(2024, 1, 2, 15, 30, 0, 250000)]
+    service.close()
+
+
+def test_get_ticks_soa_returns_numpy_columns(tmp_path):
+    ticks = [
+        TickData(
+            time=datetime(2024, 1, 2, 15, 30, second),
+            bid=None if second == 1 else 1.0,
+            ask=1.5,
+            last=1.25 + second,
+            volume=None if second == 2 else second,
+            instrument="ES",
+        )
+        for second in range(3)
+    ]
+    service = StorageService(db_path=tmp_path / "market.db")
+    service.save_ticks(ticks)
+    columns = service.get_ticks_soa(instrument="ES")
+    service.close()
+
+    assert columns["time"].dtype == np.dtype("datetime64[ns]")
+    assert columns["time"][0] == np.datetime64("2024-01-02T15:30:00")
+    assert np.isnan(columns["bid"][1])
+    assert columns["last"].tolist() == [1.25, 2.25, 3.25]
+    assert columns["volume"].tolist() == [0, 1, -1]
+
+
+def test_iter_ticks_streams_across_fetch_blocks(tmp_path):
+    base = datetime(2024, 1, 2)
+    ticks = [
+        TickData(
+            time=base + timedelta(seconds=index),
+            bid=1.0,
+            ask=1.5,
+            last=float(index),
+            volume=1,
+            instrument="ES",
+        )
+        for index in range(2500)
+    ]
+    service = StorageService(db_path=tmp_path / "market.db")
+    service.save_ticks(ticks)
+    streamed = service.iter_ticks(instrument="ES")
+    assert next(streamed).last == 0.0
+    assert sum(1 for _ in streamed) == 2499
+    service.close()
+
+
+def test_nested_reads_inside_a_stream_do_not_wait_for_the_pool(tmp_path):
+    backend = SQLiteStorageBackend(tmp_path / "market.db", max_readers=1)
+    service = StorageService(backend=backend)
+    service.save_ticks(
+        [
+            TickData(
+                time=datetime(2024, 1, 2, 15, 30, second),
+                bid=1.0,
+                ask=1.5,
+                last=float(second),
+                volume=1,
+                instrument="ES",
+            )
+            for second in range(3)
+        ]
+    )
+    latest = [
+        service.get_ticks(instrument="ES", limit=1)[0].last
+        for _ in service.iter_ticks(instrument="ES")
+    ]
+    service.close()
+    backend.close()
+
+    assert latest == [2.0, 2.0, 2.0]
+
+
+def test_limit_without_order_returns_latest_rows_chronologically(tmp_path):
+    bars = [
+        BarData(
+            time=datetime(2024, 1, day),
+            open=1.0,
+            high=2.0,
+            low=0.5,
+            close=float(day),
+            volume=100,
+            instrument="ES",
+            timeframe="1D",
+        )
+        for day in range(1, 11)
+    ]
+    service = StorageService(db_path=tmp_path / "market.db")
+    service.save_bars(bars)
+    latest = service.get_bars(instrument="ES", timeframe="1D", limit=3)
+    earliest = service.get_bars(instrument="ES", timeframe="1D", limit=3, order="asc")
+    newest_first = service.get_bars(instrument="ES", limit=2, order="desc")
+    service.close()
+
+    assert [bar.close for bar in latest] == [8.0, 9.0, 10.0]
+    assert [bar.close for bar in earliest] == [1.0, 2.0, 3.0]
+    assert [bar.close for bar in newest_first] == [10.0, 9.0]
+
+
+def test_submit_ticks_future_can_be_awaited_from_asyncio(tmp_path):
+    tick = TickData(
+        time=datetime(2024, 1, 2, 15, 30),
+        bid=1.0,
+        ask=1.5,
+        last=1.25,
+        volume=1,
+        instrument="ES",
+    )
+    service = StorageService(db_path=tmp_path / "market.db")
+
+    async def persist() -> int:
+        return await asyncio.wrap_future(service.submit_ticks([tick, tick]))
+
+    assert asyncio.run(persist()) == 2
+    service.close()
+
+
+def test_cancelled_submit_is_skipped_and_writer_keeps_running(tmp_path):
+    release = threading.Event()
+
+    class BlockingBackend(SQLiteStorageBackend):
+        def save_ticks(self, ticks):
+            release.wait(timeout=5)
+            return super().save_ticks(ticks)
+
+    def tick(last):
+        return TickData(
+            time=datetime(2024, 1, 2, 15, 30),
+            bid=1.0,
+            ask=1.5,
+            last=last,
+            volume=1,
+            instrument="ES",
+        )
+
+    backend = BlockingBackend(tmp_path / "market.db")
+    service = StorageService(backend=backend, max_latency=0.0)
+    first = service.submit_ticks([tick(1.0)])
+    time.sleep(0.05)  # el escritor ya esta guardando ``first``
+    cancelled = service.submit_ticks([tick(2.0)])
+    assert cancelled.cancel()
+    release.set()
+
+    assert first.result(timeout=5) == 1
+    assert [t.last for t in service.get_ticks(instrument="ES")] == [1.0]
+    assert service.submit_ticks([tick(3.0)]).result(timeout=5) == 1
+    service.close()
+    backend.close()
+
+
+def test_single_tick_saves_are_coalesced_into_batches(tmp_path):
+    class RecordingBackend(SQLiteStorageBackend):
+        def __init__(self, db_path):
+            super().__init__(db_path)
+            self.batch_sizes = []
+
+        def save_ticks(self, ticks):
+            self.batch_sizes.append(len(ticks))
+            return super().save_ticks(ticks)
+
+    tick = TickData(
+        time=datetime(2024, 1, 2, 15, 30),
+        bid=1.0,
+        ask=1.5,
+        last=1.25,
+        volume=1,
+        instrument="ES",
+    )
+    backend = RecordingBackend(tmp_path / "market.db")
+    service = StorageService(backend=backend, batch_size=100, max_latency=5.0)
+    for _ in range(250):
+        service.save_ticks([tick])
+    service.close()
+    backend.close()
+
+    assert sum(backend.batch_sizes) == 250
+    assert backend.batch_sizes[:2] == [100, 100]
+
+
+def test_dataframe_fetches_keep_types(tmp_path):
+    tick = TickData(
+        time=datetime(2024, 1, 2, 15, 30),
+        bid=1.0,
+        ask=1.5,
+        last=1.25,
+        volume=None,
+        instrument="ES",
+    )
+    bar = BarData(
+        time=datetime(2024, 1, 2),
+        open=1.0,
+        high=2.0,
+        low=0.5,
+        close=1.5,
+        volume=100,
+        instrument="ES",
+        timeframe="1D",
+    )
+    service = StorageService(db_path=tmp_path / "market.db")
+    service.save_ticks([tick])
+    service.save_bars([bar])
+    ticks = service.get_ticks_df(instrument="ES")
+    bars = service.get_bars_df(instrument="ES", timeframe="1D")
+    service.close()
+
+    assert ticks["time"].iloc[0] == tick.time
+    assert ticks["volume"].isna().iloc[0]
+    assert list(bars.columns[:3]) == ["instrument", "timeframe", "time"]
+    assert bars["time"].iloc[0] == bar.time
+    assert bars["close"].tolist() == [1.5]
+
+
+def test_tick_bars_are_rolled_up_from_ticks(tmp_path):
+    def tick(minute, second, last, volume=1):
+        return TickData(
+            time=datetime(2024, 1, 2, 15, minute, second),
+            bid=None,
+            ask=None,
+            last=last,
+            volume=volume,
+            instrument="ES",
+        )
+
+    ticks = [
+        tick(30, 10, 2.0),
+        tick(30, 5, 1.0),
+        tick(30, 20, 3.0, volume=None),
+        tick(30, 40, None),
+        tick(30, 50, 0.5),
+        tick(31, 0, 4.0, volume=2),
+    ]
+    service = StorageService(db_path=tmp_path / "market.db")
+    service.save_ticks(ticks)
+    minutes = service.get_tick_bars(instrument="ES", timeframe="1m")
+    five = service.get_tick_bars(instrument="ES", timeframe="5m")
+    latest = service.get_tick_bars(instrument="ES", timeframe="1m", limit=1)
+    for timeframe, limit in (("1m", None), ("5m", None), ("1m", 1)):
+        # La version por defecto recorre los ticks y debe coincidir con el agregado.
+        assert StorageBackend.fetch_tick_bars(
+            service._backend, "ES", timeframe, limit=limit
+        ) == service.get_tick_bars(instrument="ES", timeframe=timeframe, limit=limit)
+    service.close()
+
+    first, second = minutes
+    assert first.time == datetime(2024, 1, 2, 15, 30)
+    assert (first.open, first.high, first.low, first.close) == (1.0, 3.0, 0.5, 0.5)
+    assert first.volume == 3
+    assert (second.open, second.close, second.volume) == (4.0, 4.0, 2)
+    assert [(bar.time, bar.open, bar.close, bar.volume) for bar in five] == [
+        (datetime(2024, 1, 2, 15, 30), 1.0, 4.0, 5)
+    ]
+    assert [bar.time for bar in latest] == [datetime(2024, 1, 2, 15, 31)]
+
+
+def test_autoincrement_tables_are_rebuilt_on_rowid(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    StorageService(db_path=db_path).close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE ticks")
+    conn.execute(
+        "CREATE TABLE ticks (id INTEGER PRIMARY KEY AUTOINCREMENT, instrument TEXT"
+        " NOT NULL, time INTEGER NOT NULL, bid REAL, ask REAL, last REAL,"
+        " volume INTEGER)"
+    )
+    conn.execute(
+        "INSERT INTO ticks (instrument, time, bid, ask, last, volume)"
+        " VALUES ('ES', 1704209400000000000, 1.0, 1.5, 1.25, 3)"
+    )
+    conn.execute("PRAGMA user_version=2")
+    conn.commit()
+    conn.close()
+
+    service = StorageService(db_path=db_path)
+    service.save_ticks(
+        [
+            TickData(
+                time=datetime(2024, 1, 2, 15, 30, 30),
+                bid=1.0,
+                ask=1.5,
+                last=2.0,
+                volume=1,
+                instrument="ES",
+            )
+        ]
+    )
+    ticks = service.get_ticks(instrument="ES")
+    bars = service.get_tick_bars(instrument="ES")
+    service.close()
+
+    conn = sqlite3.connect(db_path)
+    schema = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'ticks'").fetchone()
+    conn.close()
+    assert "AUTOINCREMENT" not in schema[0]
+    assert [tick.last for tick in ticks] == [1.25, 2.0]
+    assert bars[0].close == 2.0
+
+
+def test_locked_writes_are_retried(tmp_path):
+    db_path = tmp_path / "market.db"
+    backend = SQLiteStorageBackend(db_path)
+    backend._writer.execute("PRAGMA busy_timeout=0")
+    blocker = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.02, blocker.execute, ("ROLLBACK",)).start()
+    tick = TickData(
+        time=datetime(2024, 1, 2, 15, 30),
+        bid=1.0,
+        ask=1.5,
+        last=1.25,
+        volume=1,
+        instrument="ES",
+    )
+
+    assert backend.save_ticks([tick, tick]) == 2
+    assert len(backend.fetch_ticks(instrument="ES")) == 2
+    backend.close()
+    blocker.close()
+
+
+def test_columnar_batches_are_saved_without_building_objects(tmp_path):
+    class ColumnarOnly(TickBatch):
+        def _from_record(self, row):
+            raise AssertionError("el lote no debe recorrerse fila a fila")
+
+    ticks = [
+        TickData(
+            time=datetime(2024, 1, 2, 15, 30, second),
+            bid=None if second == 1 else 1.0,
+            ask=1.5,
+            last=1.25,
+            volume=None if second == 2 else second,
+            instrument="NQ" if second == 0 else "ES",
+        )
+        for second in range(3)
+    ]
+    bars = [
+        BarData(
+            time=datetime(2024, 1, day),
+            open=1.0,
+            high=2.0,
+            low=0.5,
+            close=float(day),
+            volume=100,
+            instrument="ES",
+            timeframe="1D",
+        )
+        for day in (2, 3)
+    ]
+    batch = ColumnarOnly.from_records(ticks)
+    service = StorageService(db_path=tmp_path / "market.db")
+    future = service.submit_ticks(batch)
+    # El servicio encola una copia: reutilizar el lote no altera lo guardado.
+    batch.clear()
+    assert future.result(timeout=5) == 3
+    service.save_bars(BarBatch.from_bars(bars))
+
+    assert service.get_ticks() == ticks
+    assert service.get_bars(instrument="ES", timeframe="1D") == bars
+    service.close()
+
@@ -0,0 +1,29 @@
+﻿from datetime import datetime
+
+from nt_data.models import TickData
+
+
+def test_reset_overwrites_every_field_but_the_instrument():
+    tick = TickData(
+        time=datetime(2024, 1, 2, 15, 30),
+        bid=1.0,
+        ask=1.5,
+        last=1.25,
+        volume=10,
+        instrument="ES",
+    )
+    tick.reset(
+        time=datetime(2024, 1, 2, 15, 31),
+        bid=None,
+        ask=2.5,
+        last=2.25,
+        volume=None,
+    )
+    assert tick == TickData(
+        time=datetime(2024, 1, 2, 15, 31),
+        bid=None,
+        ask=2.5,
+        last=2.25,
+        volume=None,
+        instrument="ES",
+    )